@@ -0,0 +1,60 @@
+# 엑셀 읽기 속도 비교 (pd.read_excel vs 읽기 전용 빠른 경로)
+# 사용법: python bench_excel.py [행 수] [반복 횟수]
+import os
+import sys
+import tempfile
+import time
+
+import openpyxl
+import pandas as pd
+
+from vote_data import read_vote_file, read_sheet, sniff_file_meta, _apply_header, python_calamine
+
+
+def make_workbook(path, n_rows):
+    # NEC 사전투표 현황과 같은 형태의 테스트 파일 생성
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["사전투표 투표자 현황"])
+    ws.append(["[1일차] [13:00] 기준"])
+    ws.append([])
+    ws.append(["시도명", "구시군명", "읍면동명", "사전투표소명", "선거인수", "관내사전투표자수", "관외사전투표자수", "사전투표자수"])
+    for i in range(n_rows):
+        ws.append(["서울", "성동구", f"동{i % 17}", f"동{i}사전투표소", 20000, f"{i * 7:,}", i * 3, i * 10])
+    wb.save(path)
+
+
+def bench(label, func, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<32} {best * 1000:9.1f} ms")
+    return best
+
+
+def read_vote_file_default(path):
+    # 기존 방식: pd.read_excel 로 전체 파싱 후 헤더 적용
+    raw = pd.read_excel(path, header=None)
+    day, time_, header_idx = sniff_file_meta(raw.head(10))
+    return day, time_, _apply_header(raw, header_idx)
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.xlsx")
+        make_workbook(path, n_rows)
+        print(f"행 수: {n_rows:,}, 반복: {repeat}회 (최솟값), 엔진: {'calamine' if python_calamine else 'openpyxl read_only'}")
+
+        t_old = bench("투표 데이터 - pd.read_excel", lambda: read_vote_file_default(path), repeat)
+        t_new = bench("투표 데이터 - 빠른 경로", lambda: read_vote_file(path), repeat)
+        print(f"  -> {t_old / t_new:.1f}배")
+
+        t_old = bench("표 읽기 - pd.read_excel", lambda: pd.read_excel(path, header=None), repeat)
+        t_new = bench("표 읽기 - read_sheet", lambda: read_sheet(path, header=None), repeat)
+        print(f"  -> {t_old / t_new:.1f}배")
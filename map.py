@@ -9,6 +9,7 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 import glob  # <--- [추가] 파일 목록을 조회하는 라이브러리
+from vote_data import read_csv_auto
 
 # ==========================================
 # [필수] 카카오 REST API 키 입력
@@ -111,8 +112,7 @@ def create_map_from_combined_data():
                 temp_df = pd.read_excel(filename, header=4) # header 위치 주의
             # CSV인 경우
             else:
-                try: temp_df = pd.read_csv(filename, header=4, encoding='cp949')
-                except: temp_df = pd.read_csv(filename, header=4, encoding='utf-8')
+                temp_df = read_csv_auto(filename, header=4) # 인코딩(cp949/utf-8) 자동 감지
             
             # '소재지' 컬럼이 있는지 확인 (데이터 유효성 검사)
             if '소재지' in temp_df.columns:
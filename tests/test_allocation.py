@@ -0,0 +1,258 @@
+# 자동 배분 그리디(힙) / 일괄 배분 / 예산 곡선이 기존 전체 탐색 루프와 같은 결과인지 무작위 비교
+import copy
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from vote_alloc import (WEIGHT_RANGE, budget_sweep, bulk_allocate, estimate_extra_weight, exact_allocate,
+                        extra_weight, greedy_allocate, queue_load)
+
+
+def _old_next_target(current_alloc, station_stats, weight_extra):
+    # 기존 루프의 1스텝: 전체 창구를 순서대로 훑어 부하가 '더 큰'(strict >) 창구 선택, 관내를 관외보다 먼저 비교
+    max_load = -1
+    target = None
+    for st in current_alloc:
+        s = station_stats.get(st, {'intra_voters': 0, 'extra_voters': 0})
+        c_intra = current_alloc[st]['intra']
+        load_intra = s['intra_voters'] / c_intra if c_intra > 0 else float('inf')
+        if load_intra > max_load:
+            max_load = load_intra
+            target = (st, 'intra')
+        c_extra = current_alloc[st]['extra']
+        load_extra = (s['extra_voters'] * extra_weight(weight_extra, st)) / c_extra if c_extra > 0 else float('inf')
+        if load_extra > max_load:
+            max_load = load_extra
+            target = (st, 'extra')
+    return max_load, target
+
+
+def _old_allocate(current_alloc, station_stats, remaining, weight_extra):
+    while remaining > 0:
+        _, target = _old_next_target(current_alloc, station_stats, weight_extra)
+        if target:
+            current_alloc[target[0]][target[1]] += 1
+            remaining -= 1
+        else:
+            break
+    return current_alloc
+
+
+def _random_case(rnd, max_stations=12, max_remaining=60):
+    n = rnd.randint(0, max_stations)
+    stations = [f"s{i}" for i in range(n)]
+    rnd.shuffle(stations)
+    # 같은 값을 자주 뽑아 부하 동률을 강제 / 0명 투표소 포함 / 일부 투표소는 통계 없음
+    pool = [0, 100, 200, 300, 1000, rnd.random() * 500]
+    stats = {st: {'intra_voters': rnd.choice(pool) if rnd.random() < 0.5 else rnd.randint(0, 3000),
+                  'extra_voters': rnd.choice(pool) if rnd.random() < 0.5 else rnd.randint(0, 800)}
+             for st in stations if rnd.random() < 0.9}
+    alloc = {st: {'intra': rnd.choice([0, 1, 1, 2, 5]), 'extra': rnd.choice([0, 1, 1, 3])} for st in stations}
+    remaining = rnd.randint(-2, max_remaining)
+    weight = rnd.choice([1.0, 1.156, 1.18, 2.0, 0.7])
+    if stations and rnd.random() < 0.2:
+        weight = {'default': weight, stations[0]: rnd.choice([1.0, 1.5])}
+    return alloc, stats, remaining, weight
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_greedy_allocate_matches_full_scan(seed):
+    rnd = random.Random(seed)
+    for _ in range(300):
+        alloc, stats, remaining, weight = _random_case(rnd)
+        expected = _old_allocate(copy.deepcopy(alloc), stats, remaining, weight)
+        assert greedy_allocate(copy.deepcopy(alloc), stats, remaining, weight) == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bulk_allocate_matches_full_scan(seed):
+    rnd = random.Random(100 + seed)
+    for _ in range(300):
+        alloc, stats, remaining, weight = _random_case(rnd, max_stations=15)
+        if rnd.random() < 0.3:
+            remaining = rnd.randint(0, 500)  # 일괄 단계를 타는 큰 예산
+        expected = _old_allocate(copy.deepcopy(alloc), stats, remaining, weight)
+        assert bulk_allocate(copy.deepcopy(alloc), stats, remaining, weight) == expected
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_budget_sweep_matches_full_scan(seed):
+    rnd = random.Random(200 + seed)
+    for _ in range(60):
+        alloc, stats, _, weight = _random_case(rnd, max_stations=8)
+        if not alloc:
+            continue
+        base = sum(c['intra'] + c['extra'] for c in alloc.values())
+        before = copy.deepcopy(alloc)
+        rows = budget_sweep(alloc, stats, base + rnd.randint(0, 30), weight)
+        assert alloc == before  # 입력 배정은 변경하지 않음
+
+        for total, max_load, mean_load, st, type_ in rows:
+            expected = _old_allocate(copy.deepcopy(before), stats, total - base, weight)
+            old_max, target = _old_next_target(expected, stats, weight)
+            assert (st, type_) == target
+            assert max_load == old_max
+            loads = []
+            for name, counts in expected.items():
+                s = stats.get(name, {'intra_voters': 0, 'extra_voters': 0})
+                loads.append(queue_load(s['intra_voters'], counts['intra']))
+                loads.append(queue_load(s['extra_voters'] * extra_weight(weight, name), counts['extra']))
+            if float('inf') in loads:
+                assert mean_load == float('inf')
+            else:
+                assert mean_load == pytest.approx(sum(loads) / len(loads))
+
+
+def _brute_force_max_load(alloc, stats, remaining, weight, caps, groups, group_budgets):
+    # 추가 장비의 모든 나눠 주기 조합 중 제약 조건을 지키는 최소 '최대 부하' (작은 경우만)
+    stations = list(alloc)
+    voters, lows, cap, group_of = [], [], [], []
+    for st in stations:
+        s = stats.get(st, {'intra_voters': 0, 'extra_voters': 0})
+        voters += [s['intra_voters'], s['extra_voters'] * extra_weight(weight, st)]
+        lows += [alloc[st]['intra'], alloc[st]['extra']]
+        cap += [caps, caps]
+        group_of += [groups[st] if groups else 0] * 2
+    # 예산은 투표소가 있는 읍면동만 (exact_allocate 와 같은 규칙)
+    budgets = {g: group_budgets.get(g, 0) for g in set(group_of)} if groups else {0: sum(lows) + remaining}
+    total = sum(lows) + remaining
+    pool = max(total - sum(budgets.values()), 0)
+
+    best = None
+    for add in itertools.product(range(remaining + 1), repeat=len(lows)):
+        if sum(add) > remaining:
+            continue
+        counts = [lo + a for lo, a in zip(lows, add)]
+        if any(c > cp for c, cp in zip(counts, cap)):
+            continue
+        used = {}
+        for g, c in zip(group_of, counts):
+            used[g] = used.get(g, 0) + c
+        if sum(max(used[g] - budgets.get(g, 0), 0) for g in used) > pool:
+            continue
+        load = max(queue_load(v, c) for v, c in zip(voters, counts))
+        best = load if best is None else min(best, load)
+    return best
+
+
+@pytest.mark.parametrize("constrained", [False, True])
+def test_exact_allocate_matches_brute_force(constrained):
+    rnd = random.Random(300 + constrained)
+    checked = 0
+    for _ in range(80):
+        n = rnd.randint(1, 3)
+        stations = [f"s{i}" for i in range(n)]
+        stats = {st: {'intra_voters': rnd.choice([0, 100, 300, rnd.randint(0, 2000)]),
+                      'extra_voters': rnd.choice([0, 100, rnd.randint(0, 600)])} for st in stations}
+        alloc = {st: {'intra': 1, 'extra': rnd.choice([1, 2])} for st in stations}
+        remaining = rnd.randint(0, 4 if n == 3 else 6)
+        weight = rnd.choice([1.0, 1.156])
+        caps, groups, group_budgets = 50, None, None
+        if constrained:
+            caps = rnd.randint(2, 4)
+            groups = {st: rnd.choice(['g1', 'g2']) for st in stations}
+            group_budgets = {g: rnd.randint(0, 6) for g in ('g1', 'g2')}
+
+        expected = _brute_force_max_load(alloc, stats, remaining, weight, caps, groups, group_budgets)
+        work = copy.deepcopy(alloc)
+        if expected is None:
+            with pytest.raises(ValueError):
+                exact_allocate(work, stats, remaining, weight, caps=caps, groups=groups, group_budgets=group_budgets)
+            continue
+        info = exact_allocate(work, stats, remaining, weight, caps=caps, groups=groups, group_budgets=group_budgets)
+        assert info['optimal']
+        assert info['max_load'] == pytest.approx(expected)
+        # 반환 배분이 보고한 최대 부하와 제약 조건을 실제로 만족
+        loads = [queue_load(stats[st]['intra_voters'], work[st]['intra']) for st in stations]
+        loads += [queue_load(stats[st]['extra_voters'] * weight, work[st]['extra']) for st in stations]
+        assert max(loads) == pytest.approx(info['max_load'])
+        assert all(work[st][t] >= alloc[st][t] and work[st][t] <= caps for st in stations for t in ('intra', 'extra'))
+        assert sum(c['intra'] + c['extra'] for c in work.values()) <= sum(c['intra'] + c['extra'] for c in alloc.values()) + remaining
+        checked += 1
+    assert checked > 20
+
+
+def test_exact_allocate_infeasible_raises():
+    stats = {'a': {'intra_voters': 100, 'extra_voters': 10}}
+    # 최소 장비(관외 3대) > 상한 2대
+    with pytest.raises(ValueError):
+        exact_allocate({'a': {'intra': 1, 'extra': 3}}, stats, 2, 1.0, caps=2)
+    # 최소 장비 합계 > 전체 장비 (남은 장비가 음수)
+    with pytest.raises(ValueError):
+        exact_allocate({'a': {'intra': 1, 'extra': 1}}, stats, -1, 1.0)
+
+
+def test_exact_allocate_budgets_above_total():
+    # 읍면동 기존 장비(8 + 4) > 가용 장비 10대 (예비 장비 증가): 최소 6대 + 4대 추가는 가능해야 함
+    stats = {'a': {'intra_voters': 900, 'extra_voters': 100}, 'b': {'intra_voters': 500, 'extra_voters': 50},
+             'c': {'intra_voters': 300, 'extra_voters': 100}}
+    alloc = {st: {'intra': 1, 'extra': 1} for st in stats}
+    info = exact_allocate(alloc, stats, 4, 1.0, groups={'a': 'g1', 'b': 'g1', 'c': 'g2'},
+                          group_budgets={'g1': 8, 'g2': 4})
+    assert sum(c['intra'] + c['extra'] for c in alloc.values()) == 10
+    assert info['optimal']
+    assert info['max_load'] == pytest.approx(_brute_force_max_load(
+        {st: {'intra': 1, 'extra': 1} for st in stats}, stats, 4, 1.0, 50,
+        {'a': 'g1', 'b': 'g1', 'c': 'g2'}, {'g1': 8, 'g2': 4}))
+
+
+def test_exact_allocate_without_constraints_matches_greedy():
+    rnd = random.Random(400)
+    for _ in range(200):
+        alloc, stats, remaining, weight = _random_case(rnd)
+        alloc = {st: {'intra': max(c['intra'], 1), 'extra': max(c['extra'], 1)} for st, c in alloc.items()}
+        if not alloc or remaining < 0:
+            continue
+        greedy = greedy_allocate(copy.deepcopy(alloc), stats, remaining, weight)
+        greedy_max = max(max(queue_load(stats.get(st, {}).get('intra_voters', 0), c['intra']),
+                             queue_load(stats.get(st, {}).get('extra_voters', 0) * extra_weight(weight, st), c['extra']))
+                         for st, c in greedy.items())
+        info = exact_allocate(copy.deepcopy(alloc), stats, remaining, weight, caps=10 ** 6)
+        assert info['greedy_max_load'] == pytest.approx(greedy_max)
+        assert info['max_load'] == pytest.approx(greedy_max)
+        assert info['optimal'] and info['gap'] == 0.0
+
+
+def _demand(rng, n_st, scale, counts):
+    # [투표소, 일차, 시간대] 시간대별 수요 (투표소마다 규모가 다름)
+    return rng.gamma(2, scale, (n_st, 2, 13)) * counts[:, None, None] * rng.uniform(0.3, 2, (n_st, 1, 1))
+
+
+def test_estimate_extra_weight_recovers_capacity_ratio():
+    # 처리 능력: 관내 120명/시간/대, 관외 100명/시간/대 -> 혼잡 시간대는 상한에서 잘림 -> 1.2
+    rng = np.random.default_rng(0)
+    n_intra, n_extra = rng.integers(1, 6, 400), rng.integers(1, 4, 400)
+    delta_intra = np.minimum(_demand(rng, 400, 40, n_intra), 120 * n_intra[:, None, None])
+    delta_extra = np.minimum(_demand(rng, 400, 30, n_extra), 100 * n_extra[:, None, None])
+    est = estimate_extra_weight(delta_intra, delta_extra, n_intra, n_extra)
+    assert est['weight'] == pytest.approx(1.2, rel=0.02)
+    assert not est['clamped']
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_estimate_extra_weight_ignores_unsaturated_demand(seed):
+    # 두 창구 모두 비혼잡 + 관내 수요가 관외보다 훨씬 큼: 처리량 비율은 수요 비율이므로 추정하지 않아야 함
+    rng = np.random.default_rng(seed)
+    n_intra, n_extra = rng.integers(1, 6, 400), rng.integers(1, 4, 400)
+    delta_intra = _demand(rng, 400, 12, n_intra)
+    delta_extra = _demand(rng, 400, 3, n_extra)
+    assert estimate_extra_weight(delta_intra, delta_extra, n_intra, n_extra) is None
+
+    # 시간대 모양이 매끈한(정오 정점) 비혼잡 수요도 마찬가지
+    hump = np.exp(-((np.arange(13) - 6) / 3.0) ** 2)
+    delta_intra = hump * 300 * rng.uniform(0.8, 1.2, (400, 2, 13))
+    delta_extra = hump * 60 * rng.uniform(0.8, 1.2, (400, 2, 13))
+    assert estimate_extra_weight(delta_intra, delta_extra, np.full(400, 2), np.full(400, 1)) is None
+
+
+def test_estimate_extra_weight_clamps_out_of_range():
+    # 포화 상한 비율이 3.0 이면 허용 범위 상한으로 자르고 알림
+    rng = np.random.default_rng(1)
+    counts = np.ones(200, dtype=int)
+    delta_intra = np.minimum(_demand(rng, 200, 400, counts), 300)
+    delta_extra = np.minimum(_demand(rng, 200, 150, counts), 100)
+    est = estimate_extra_weight(delta_intra, delta_extra, counts, counts)
+    assert est['raw'] == pytest.approx(3.0)
+    assert est['clamped'] and est['weight'] == WEIGHT_RANGE[1]
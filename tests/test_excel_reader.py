@@ -0,0 +1,66 @@
+# 읽기 전용 엑셀 경로(openpyxl read_only)가 pd.read_excel 과 같은 결과인지 확인
+# (저장된 시트 크기 <dimension> 이 틀린 파일 포함)
+import re
+import zipfile
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import vote_data
+from vote_data import read_sheet, read_vote_file
+
+
+def _make_workbook(path, n_rows=5):
+    # NEC 사전투표 현황과 같은 형태 (제목 / 태그 / 빈 줄 / 헤더 / 본문)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["사전투표 투표자 현황"])
+    ws.append(["[1일차] [13:00] 기준"])
+    ws.append([])
+    ws.append(["시도명", "구시군명", "읍면동명", "사전투표소명", "선거인수", "관내사전투표자수", "관외사전투표자수", "사전투표자수"])
+    for i in range(n_rows):
+        ws.append(["서울", "성동구", f"동{i}", f"동{i}사전투표소", 20000, i * 7, i * 3, i * 10])
+    wb.save(path)
+
+
+def _break_dimension(path):
+    # 시트 XML 의 <dimension ref="A1:H9"/> 를 A1 로 바꿔 엑셀 외 프로그램이 만든 파일을 흉내냄
+    with zipfile.ZipFile(path) as zf:
+        items = {name: zf.read(name) for name in zf.namelist()}
+    sheet = 'xl/worksheets/sheet1.xml'
+    items[sheet] = re.sub(rb'<dimension ref="[^"]*"\s*/>', b'<dimension ref="A1"/>', items[sheet])
+    assert b'<dimension ref="A1"/>' in items[sheet]
+    with zipfile.ZipFile(path, 'w') as zf:
+        for name, data in items.items():
+            zf.writestr(name, data)
+
+
+@pytest.fixture(autouse=True)
+def _openpyxl_path(monkeypatch):
+    # calamine 설치 여부와 무관하게 openpyxl 읽기 전용 경로를 검사
+    monkeypatch.setattr(vote_data, 'python_calamine', None)
+
+
+@pytest.mark.parametrize("broken", [False, True])
+def test_read_vote_file_matches_read_excel(tmp_path, broken):
+    path = str(tmp_path / "vote.xlsx")
+    _make_workbook(path)
+    if broken:
+        _break_dimension(path)
+
+    day, time, df = read_vote_file(path)
+    assert (day, time) == (1, 13)
+    expected = pd.read_excel(path, header=3)
+    assert len(df) == 5
+    pd.testing.assert_frame_equal(df, expected)
+
+
+@pytest.mark.parametrize("broken", [False, True])
+def test_read_sheet_matches_read_excel(tmp_path, broken):
+    path = str(tmp_path / "sheet.xlsx")
+    _make_workbook(path)
+    if broken:
+        _break_dimension(path)
+
+    pd.testing.assert_frame_equal(read_sheet(path, header=None), pd.read_excel(path, header=None))
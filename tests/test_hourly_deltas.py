@@ -0,0 +1,67 @@
+# SnapshotStore.to_frame(deltas=True) 가 기존 groupby().diff() + 첫 행 .loc 채우기와 같은 결과인지 확인
+import numpy as np
+import pandas as pd
+import pytest
+
+from vote_data import SnapshotStore
+
+
+def _old_deltas(df):
+    # 기존 _execute_simulation 방식 (일차별 첫 시간대는 누적값 그대로)
+    df = df.copy()
+    df['시간대별_관내투표자수'] = df.groupby(['사전투표소명', '일차'], observed=True)['관내사전투표자수'].diff()
+    df['시간대별_관외투표자수'] = df.groupby(['사전투표소명', '일차'], observed=True)['관외사전투표자수'].diff()
+    for (st, day), group in df.groupby(['사전투표소명', '일차'], observed=True):
+        first_idx = group.index[0]
+        df.loc[first_idx, '시간대별_관내투표자수'] = df.loc[first_idx, '관내사전투표자수']
+        df.loc[first_idx, '시간대별_관외투표자수'] = df.loc[first_idx, '관외사전투표자수']
+    return df
+
+
+def _make_entries(seed, n_st=6):
+    # 파일 1개 = (일차, 시간대) 1개의 투표소별 누적 현황 (시간대 누락 / NaN 값 / 중복 파일 포함)
+    rng = np.random.default_rng(seed)
+    names = [f"동{i}사전투표소" for i in range(n_st)]
+    entries = []
+    for day in (1, 2):
+        cum_i = np.zeros(n_st)
+        cum_e = np.zeros(n_st)
+        for hour in range(7, 19):
+            cum_i += rng.integers(0, 300, n_st)
+            cum_e += rng.integers(0, 80, n_st)
+            keep = rng.random(n_st) > 0.2  # 일부 투표소는 이 시간대 행 누락
+            if hour in (10, 15) and day == 2:
+                keep[:] = False  # 시간대 전체 누락
+            intra = cum_i.astype(object)
+            intra[rng.random(n_st) < 0.1] = np.nan
+            df = pd.DataFrame({
+                '읍면동명': [f"동{i}" for i in range(n_st)],
+                '사전투표소명': names,
+                '관내사전투표자수': intra,
+                '관외사전투표자수': cum_e.copy(),
+            })[keep].reset_index(drop=True)
+            entries.append((df, day, hour))
+    entries.append(entries[3])  # 같은 파일 중복 선택
+    return entries
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_to_frame_deltas_matches_groupby_diff(seed):
+    store = SnapshotStore.from_frames(_make_entries(seed))
+    rng = np.random.default_rng(100 + seed)
+    f_intra = 1 + rng.uniform(-0.3, 0.3, len(store.stations))
+    f_extra = 1 + rng.uniform(-0.3, 0.3, len(store.stations))
+
+    expected = _old_deltas(store.to_frame(f_intra, f_extra))
+    result = store.to_frame(f_intra, f_extra, deltas=True)
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+
+def test_hourly_deltas_array_matches_frame():
+    store = SnapshotStore.from_frames(_make_entries(0))
+    delta_intra, delta_extra = store.hourly_deltas(store.intra, store.extra)
+    frame = store.to_frame(deltas=True)
+    s_idx, d_idx, h_idx = np.nonzero(store.present)
+    np.testing.assert_array_equal(delta_intra[s_idx, d_idx, h_idx], frame['시간대별_관내투표자수'].to_numpy())
+    np.testing.assert_array_equal(delta_extra[s_idx, d_idx, h_idx], frame['시간대별_관외투표자수'].to_numpy())
+    assert np.isnan(delta_intra[~store.present]).all()
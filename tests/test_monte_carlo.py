@@ -0,0 +1,79 @@
+# 몬테카를로 혼잡도 분위수: 재현성 / 분위수 순서 / 일차 합계 보존 / 0 시간대 유지
+import threading
+
+import numpy as np
+
+from vote_sim import _perturb, monte_carlo_bands
+
+
+def _deltas(seed=0, n_st=30):
+    rng = np.random.default_rng(seed)
+    delta_intra = rng.gamma(2, 40, (n_st, 2, 13))
+    delta_extra = rng.gamma(2, 15, (n_st, 2, 13))
+    delta_intra[rng.random(delta_intra.shape) < 0.05] = np.nan  # 데이터 없는 칸
+    delta_intra[:, :, 0] = 0.0  # 투표자가 없던 시간대
+    delta_extra[:3] = 0.0  # 관외 투표자가 전혀 없는 투표소
+    return delta_intra, delta_extra
+
+
+def test_same_seed_same_result():
+    delta_intra, delta_extra = _deltas()
+    # 같은 입력/시드/묶음 크기로 두 번 실행하면 같은 결과, 시드가 다르면 다른 결과
+    a = monte_carlo_bands(delta_intra, delta_extra, n_draws=300, seed=7, batch_cells=50_000)
+    b = monte_carlo_bands(delta_intra, delta_extra, n_draws=300, seed=7, batch_cells=50_000)
+    for key in ('intra', 'extra', 'peak_intra', 'peak_extra'):
+        np.testing.assert_array_equal(a[key], b[key])
+    c = monte_carlo_bands(delta_intra, delta_extra, n_draws=300, seed=8, batch_cells=50_000)
+    assert not np.array_equal(a['peak_intra'], c['peak_intra'])
+
+
+def test_quantiles_are_ordered_per_cell():
+    delta_intra, delta_extra = _deltas(1)
+    bands = monte_carlo_bands(delta_intra, delta_extra, n_draws=500, seed=1)
+    for key, delta in (('intra', delta_intra), ('extra', delta_extra)):
+        p50, p90, p99 = bands[key]
+        have = ~np.isnan(delta)
+        assert np.isnan(p50[~have]).all()
+        assert (p50[have] <= p90[have]).all() and (p90[have] <= p99[have]).all()
+        peak50, peak90, peak99 = bands['peak_' + key]
+        assert (peak50 <= peak90).all() and (peak90 <= peak99).all()
+
+
+def test_zero_hours_stay_zero():
+    delta_intra, delta_extra = _deltas(2)
+    bands = monte_carlo_bands(delta_intra, delta_extra, n_draws=200, seed=2)
+    assert (bands['intra'][:, :, :, 0] == 0).all()
+    assert (bands['extra'][:, :3] == 0).all()
+    assert (bands['peak_extra'][:, :3] == 0).all()
+
+
+def test_draws_preserve_day_totals():
+    delta_intra, _ = _deltas(3)
+    day_total = np.nansum(delta_intra, axis=2)
+    rng = np.random.default_rng(3)
+
+    # 투표율 변동이 없으면 시행마다 일차 합계가 그대로 (시간대 비율만 흔들림)
+    turnout = np.ones((len(delta_intra), 1, 1, 100))
+    sim, missing = _perturb(rng, delta_intra, turnout, shape_sigma=0.3)
+    np.testing.assert_allclose(sim.sum(axis=2), np.broadcast_to(day_total[..., None], sim.sum(axis=2).shape))
+    assert (sim[missing] == 0).all()
+
+    # 투표율 변동(평균 1 로그정규)이 있으면 일차 합계는 기댓값으로 보존
+    sigma = 0.1
+    turnout = rng.lognormal(-sigma ** 2 / 2, sigma, size=(len(delta_intra), 1, 1, 4000))
+    sim, _ = _perturb(rng, delta_intra, turnout, shape_sigma=0.2)
+    mean_total = sim.sum(axis=2).mean(axis=-1)
+    np.testing.assert_allclose(mean_total, day_total, rtol=0.02)
+
+
+def test_cancel_and_progress_per_batch():
+    delta_intra, delta_extra = _deltas(4)
+    reported = []
+    bands = monte_carlo_bands(delta_intra, delta_extra, n_draws=100, seed=4, batch_cells=26 * 100 * 5,
+                              progress=reported.append)
+    assert bands is not None
+    assert reported == sorted(reported) and len(reported) == 6  # 30곳 / 묶음당 5곳
+
+    cancel = threading.Event()
+    cancel.set()
+    assert monte_carlo_bands(delta_intra, delta_extra, n_draws=100, seed=4, cancel=cancel) is None
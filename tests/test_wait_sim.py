@@ -0,0 +1,98 @@
+# 대기시간 이산 사건 시뮬레이션과 Erlang-C 해석식이 같은 조건에서 일관된 결과를 내는지 확인
+import math
+
+import numpy as np
+import pytest
+
+from vote_sim import erlang_c, simulate_lane, simulate_waits
+
+
+def _erlang_c_reference(arrivals_per_hour, service_sec, servers):
+    # 일반 부동소수점 Erlang-B 점화식 (작은 c 에서의 기준값)
+    a = arrivals_per_hour * service_sec / 3600.0
+    if a == 0:
+        return 0.0, 0.0
+    if servers <= 0 or a >= servers:
+        return 1.0, math.inf
+    b = 1.0
+    for k in range(1, servers + 1):
+        b = a * b / (k + a * b)
+    c = b / (1 - (a / servers) * (1 - b))
+    return c, c * service_sec / (servers - a) / 60.0
+
+
+def test_erlang_c_matches_reference():
+    rng = np.random.default_rng(0)
+    lam = rng.uniform(0, 400, 500)
+    sec = rng.uniform(10, 60, 500)
+    servers = rng.integers(0, 12, 500)
+    p_wait, wait = erlang_c(lam, sec, servers)
+    for i in range(len(lam)):
+        ref_p, ref_w = _erlang_c_reference(lam[i], sec[i], int(servers[i]))
+        assert p_wait[i] == np.float64(ref_p) or abs(p_wait[i] - ref_p) < 1e-9
+        assert wait[i] == ref_w or abs(wait[i] - ref_w) < 1e-9 * max(1.0, ref_w)
+
+
+def test_erlang_c_large_server_count_is_finite():
+    p_wait, wait = erlang_c(1990 * 3600 / 30, 30, 2000)
+    ref_p, ref_w = _erlang_c_reference(1990 * 3600 / 30, 30, 2000)
+    assert np.isfinite(p_wait) and abs(p_wait - ref_p) < 1e-9
+    assert abs(wait - ref_w) < 1e-9
+
+
+def test_zero_servers_agree_between_modes():
+    # 장비 0대 + 도착 있음 -> 두 방식 모두 inf, 도착 없는 시간대는 0
+    hours = np.arange(7, 11)
+    present = np.ones((1, 4), dtype=bool)
+    counts = np.array([[5.0, 0.0, 3.0, 0.0]])
+    mean, p95 = simulate_lane(counts, hours, present, 0, 30, seed=1)
+    _, analytic = erlang_c(counts, 30, 0)
+    np.testing.assert_array_equal(mean, analytic)
+    np.testing.assert_array_equal(p95, analytic)
+
+    mean, _ = simulate_lane(np.zeros((1, 4)), hours, present, 0, 30, seed=1)
+    assert (mean == 0).all()
+
+
+@pytest.mark.parametrize("arrivals, servers", [(100, 2), (200, 2), (300, 3), (500, 5)])
+def test_simulate_lane_tracks_erlang_c_on_uniform_day(arrivals, servers):
+    # 하루 종일 같은 도착률 + 지수 처리 시간(M/M/c) -> 초기 2시간(빈 대기열에서 시작) 이후 평균 대기는 Erlang-C 근처
+    # 시간대별 도착 인원이 고정(포아송 아님)이라 변동이 조금 작아 해석식보다 약간 낮게 나옴
+    hours = np.arange(7, 19)
+    present = np.ones((1, 12), dtype=bool)
+    mean, p95 = simulate_lane(np.full((1, 12), float(arrivals)), hours, present, servers, 30, seed=1)
+    _, analytic = erlang_c(arrivals, 30, servers)
+    steady = float(np.mean(mean[0, 2:]))
+    assert 0.8 * analytic <= steady <= 1.05 * analytic
+    assert (p95 >= mean).all()
+
+
+def _jobs():
+    rng = np.random.default_rng(5)
+    hours = np.arange(7, 19)
+    jobs = []
+    for code in range(4):
+        present = rng.random((2, 12)) > 0.1
+        jobs.append({
+            'code': code,
+            'counts': {'intra': rng.integers(0, 150, (2, 12)).astype(float), 'extra': rng.integers(0, 50, (2, 12)).astype(float)},
+            'hours': hours, 'present': present,
+            'servers': {'intra': 2, 'extra': 1},
+            'service_sec': {'intra': 30, 'extra': 35},
+            'booths': {'intra': 3, 'extra': 2}, 'booth_sec': {'intra': 40, 'extra': 40},
+            'n_reps': 50, 'seed': 2024 + code,
+        })
+    return jobs
+
+
+def test_simulate_waits_parallel_matches_serial():
+    serial = simulate_waits(_jobs(), workers=1)
+    pooled = simulate_waits(_jobs(), workers=2)
+    assert serial.keys() == pooled.keys()
+    for code in serial:
+        for key in ('intra', 'extra'):
+            for a, b in zip(serial[code][key], pooled[code][key]):
+                np.testing.assert_array_equal(a, b)
+    # 같은 시드면 다시 실행해도 같은 결과
+    again = simulate_waits(_jobs(), workers=1)
+    np.testing.assert_array_equal(again[0]['intra'][0], serial[0]['intra'][0])
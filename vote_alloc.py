@@ -0,0 +1,336 @@
+# 사전투표 장비 자동 배분 알고리즘 (vote_program / vote_program(w_ballotbox) 공용)
+import heapq
+import time
+
+import numpy as np
+
+EMPTY_STAT = {'intra_voters': 0, 'extra_voters': 0}
+TYPES = ('intra', 'extra')
+
+
+def extra_weight(weight_extra, st):
+    # 관외 가중치 프로필: 숫자면 모든 투표소 공통, dict 면 {투표소명: 가중치} ('default' 키 또는 1.0 이 기본값)
+    if isinstance(weight_extra, dict):
+        return weight_extra.get(st, weight_extra.get('default', 1.0))
+    return weight_extra
+
+
+WEIGHT_RANGE = (0.8, 1.6)  # 관외 가중치 추정값 허용 범위 (벗어나면 경계로 자르고 알림)
+
+
+def _saturated_throughput(delta, count, near_peak, min_plateau):
+    # 투표소 창구별 '장비 1대당 시간당 처리 인원' 중 포화(처리 능력 상한)로 보이는 칸의 값 목록
+    # 포화 판단: 그 창구 자신의 최댓값의 near_peak 배 이상인 칸이 min_plateau 개 이상 (상한에서 평평하게 눌린 구간)
+    # 수요만 반영된 칸(비혼잡 시간대)은 보통 최댓값 근처에 몰리지 않으므로 제외됨
+    # -> (포화 칸 값 배열, 포화로 판단된 창구 비율)
+    count = np.asarray(count, dtype=float)
+    per_device = delta.reshape(len(count), -1) / np.where(count > 0, count, np.nan)[:, None]
+    per_device = np.where(np.isfinite(per_device) & (per_device > 0), per_device, np.nan)
+    valid = ~np.isnan(per_device).all(axis=1)
+    if not valid.any():
+        return np.zeros(0), 0.0
+    per_device = per_device[valid]
+    peak = np.nanmax(per_device, axis=1, keepdims=True)
+    near = per_device >= peak * near_peak
+    plateau = near.sum(axis=1) >= min_plateau
+    return per_device[near & plateau[:, None]], float(plateau.mean())
+
+
+def estimate_extra_weight(delta_intra, delta_extra, n_intra, n_extra, near_peak=0.98, min_plateau=3,
+                          min_cells=6, min_share=0.05, weight_range=WEIGHT_RANGE):
+    """
+    과거 스냅샷의 시간대별 처리량으로 관외/관내 1인당 처리시간 비율(= 관외 가중치)을 추정합니다.
+    - delta_*: [투표소, ...] 시간대별 순증가분 (load_profile 의 delta_intra / delta_extra)
+    - n_*: 투표소별 당시 장비 수 (0 이하인 투표소는 제외)
+    대기열이 있는(포화) 시간대에만 '장비 1대당 시간당 처리 인원'이 처리 능력을 나타내고, 나머지 시간대는
+    수요(관내 > 관외)를 나타내므로, 창구마다 상한에서 평평하게 눌린 칸만 골라 그 중앙값을 처리 능력으로 봅니다.
+    반환: {'weight': 범위로 자른 추정값, 'raw': 자르기 전 값, 'clamped': 잘렸는지, 'cells_intra', 'cells_extra': 사용한 칸 수}
+    포화 칸이 관내/관외 중 하나라도 min_cells 보다 적거나, 포화 창구가 min_share 비율보다 적으면
+    (우연히 평평한 몇 곳뿐이면) None 입니다. (비혼잡 데이터로는 추정하지 않음)
+    """
+    sat_intra, share_intra = _saturated_throughput(delta_intra, n_intra, near_peak, min_plateau)
+    sat_extra, share_extra = _saturated_throughput(delta_extra, n_extra, near_peak, min_plateau)
+    if min(sat_intra.size, sat_extra.size) < min_cells or min(share_intra, share_extra) < min_share:
+        return None
+    raw = float(np.median(sat_intra) / np.median(sat_extra))
+    weight = min(max(raw, weight_range[0]), weight_range[1])
+    return {'weight': weight, 'raw': raw, 'clamped': weight != raw,
+            'cells_intra': int(sat_intra.size), 'cells_extra': int(sat_extra.size)}
+
+
+def queue_load(voters, count):
+    # 창구(투표소의 관내 또는 관외) 1개의 부하 = 투표자 수 / 장비 수 (0대면 무조건 최우선)
+    return voters / count if count > 0 else float('inf')
+
+
+def _build_heap(current_alloc, station_stats, weight_extra):
+    # 창구별 (-부하, 투표소 순서, 관내=0/관외=1, 투표소명, 가중 투표자 수) 최소 힙
+    # 부하는 음수로 넣어 가장 큰 부하가 맨 위, 동점이면 (투표소 순서, 관내 우선) 이 작은 쪽이 먼저
+    heap = []
+    for order, st in enumerate(current_alloc):
+        s_stat = station_stats.get(st, EMPTY_STAT)
+        voters = (s_stat['intra_voters'], s_stat['extra_voters'] * extra_weight(weight_extra, st))
+        for type_idx, r_type in enumerate(TYPES):
+            load = queue_load(voters[type_idx], current_alloc[st][r_type])
+            heap.append((-load, order, type_idx, st, voters[type_idx]))
+    heapq.heapify(heap)
+    return heap
+
+
+def _greedy_step(heap, current_alloc):
+    # 가장 부하가 큰 창구에 1대 배정 -> (창구, 이전 부하, 새 부하)
+    neg_load, order, type_idx, st, voters = heapq.heappop(heap)
+    r_type = TYPES[type_idx]
+    current_alloc[st][r_type] += 1
+    new_load = queue_load(voters, current_alloc[st][r_type])
+    heapq.heappush(heap, (-new_load, order, type_idx, st, voters))
+    return -neg_load, new_load
+
+
+def greedy_allocate(current_alloc, station_stats, remaining, weight_extra):
+    """
+    남은 장비를 한 대씩 '현재 부하가 가장 큰 창구'에 배정합니다. (current_alloc 을 직접 갱신)
+    - 관내 부하 = 관내 투표자 / 관내 장비, 관외 부하 = (관외 투표자 x weight_extra) / 관외 장비
+      (weight_extra 는 숫자 또는 투표소별 dict, extra_weight 참고)
+    - 동점이면 current_alloc 순서상 앞의 투표소, 같은 투표소면 관내가 우선
+      (모든 투표소를 매번 순서대로 훑던 기존 방식과 같은 결과)
+    힙에는 창구별 현재 부하만 들어 있고, 장비를 받은 창구만 다시 넣으므로 O(remaining x log 창구 수) 입니다.
+    station_stats 에 없는 투표소는 투표자 0명으로 봅니다.
+    """
+    heap = _build_heap(current_alloc, station_stats, weight_extra)
+    while remaining > 0 and heap:
+        _greedy_step(heap, current_alloc)
+        remaining -= 1
+    return current_alloc
+
+
+def budget_sweep(current_alloc, station_stats, max_devices, weight_extra):
+    """
+    현재 배정(보통 투표소마다 관내1+관외1)에서 장비를 1대씩 그리디로 추가하며 예산별 부하를 기록합니다.
+    장비 N+1대 배분 = N대 배분 + 그리디 1스텝 이므로, 모든 예산을 한 번의 O(N log 창구 수) 패스로 구합니다.
+    반환: [(총 장비 수, 최대 부하, 평균 부하, 최대 부하 투표소, 'intra'/'extra'), ...]
+          (현재 배정 합계부터 max_devices 까지, 부하 = 장비 1대당 투표자 수)
+    current_alloc 은 변경하지 않습니다.
+    """
+    alloc = {st: dict(counts) for st, counts in current_alloc.items()}
+    heap = _build_heap(alloc, station_stats, weight_extra)
+    if not heap:
+        return []
+
+    total = sum(c['intra'] + c['extra'] for c in alloc.values())
+    loads = [-item[0] for item in heap]
+    n_queues = len(loads)
+    n_inf = sum(1 for x in loads if x == float('inf'))
+    load_sum = sum(x for x in loads if x != float('inf'))
+
+    def _row():
+        neg_load, _, type_idx, st, _ = heap[0]
+        mean = float('inf') if n_inf else load_sum / n_queues
+        return (total, -neg_load, mean, st, TYPES[type_idx])
+
+    rows = [_row()]
+    while total < max_devices:
+        old_load, new_load = _greedy_step(heap, alloc)
+        if old_load == float('inf'):
+            n_inf -= 1
+        else:
+            load_sum -= old_load
+        load_sum += new_load
+        total += 1
+        rows.append(_row())
+    return rows
+
+
+def _queues(current_alloc, station_stats, weight_extra):
+    # 창구 목록 -> (투표소 순서대로 [관내, 관외]) 가중 투표자 수 / 현재 장비 수 배열
+    voters, counts = [], []
+    for st in current_alloc:
+        s_stat = station_stats.get(st, EMPTY_STAT)
+        voters += [s_stat['intra_voters'], s_stat['extra_voters'] * extra_weight(weight_extra, st)]
+        counts += [current_alloc[st]['intra'], current_alloc[st]['extra']]
+    return np.array(voters, dtype=float), np.array(counts, dtype=float)
+
+
+def _counts_above(voters, counts, lam):
+    # 부하가 lam 보다 큰 상태에서 받게 되는 장비 수 (창구별)
+    # = (부하 voters/c 가 처음으로 lam 이하가 되는 장비 수 c*) - 현재 장비 수
+    # ceil(voters/lam) 로 근사한 뒤 실제 부하(실수 나눗셈)로 앞뒤를 보정해 그리디와 같은 비교 결과를 보장
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        c_star = np.maximum(np.ceil(voters / lam), 1.0)
+        while True:
+            dec = (c_star > 1) & (voters / (c_star - 1) <= lam)
+            inc = voters / c_star > lam
+            if not dec.any() and not inc.any():
+                break
+            c_star = c_star - dec + inc
+    return np.maximum(c_star, counts) - counts
+
+
+def bulk_allocate(current_alloc, station_stats, remaining, weight_extra, iterations=100):
+    """
+    greedy_allocate 와 같은 배분 결과를 장비 수와 무관하게 계산합니다. (current_alloc 을 직접 갱신)
+    1) 목표 부하 lam 을 이분 탐색: 창구별로 '부하 > lam' 인 동안 받을 장비 수의 합이 remaining 이하인 가장 작은 lam
+    2) 그 장비 수를 한 번에 배정 (그리디도 부하가 lam 보다 큰 배정을 항상 먼저 하므로 같은 중간 상태)
+    3) 남은 몇 대(동점 구간)는 greedy_allocate 로 마무리 -> 동점 처리 순서까지 동일
+    O(창구 수 x 탐색 횟수) 이므로 예산별 반복 계산(what-if)에 적합합니다.
+    """
+    if remaining <= 0 or not current_alloc:
+        return current_alloc
+    voters, counts = _queues(current_alloc, station_stats, weight_extra)
+
+    # lam 상한: 모든 창구의 현재 부하보다 큼 -> 0대 창구(부하 무한대)만 1대씩 받음
+    hi = float(np.max(voters / np.maximum(counts, 1))) + 1.0
+    if _counts_above(voters, counts, hi).sum() <= remaining:
+        lo = 0.0
+        for _ in range(iterations):
+            mid = (lo + hi) / 2
+            if mid <= lo or mid >= hi:
+                break
+            if _counts_above(voters, counts, mid).sum() <= remaining:
+                hi = mid
+            else:
+                lo = mid
+        add = _counts_above(voters, counts, hi).astype(int)
+        for order, st in enumerate(current_alloc):
+            current_alloc[st]['intra'] += int(add[2 * order])
+            current_alloc[st]['extra'] += int(add[2 * order + 1])
+        remaining -= int(add.sum())
+
+    return greedy_allocate(current_alloc, station_stats, remaining, weight_extra)
+
+
+MAX_PER_QUEUE = 50  # 투표소 관내/관외 창구별 최대 장비 수 (장비 수정 입력 상한과 동일)
+
+
+def _constrained_greedy(alloc, voters, caps, group_of, group_used, group_budgets, pool, remaining):
+    # 제약 조건을 지키며 '가장 부하가 큰 창구에 1대씩' 배정 (alloc/group_used 직접 갱신) -> 남은 공용 장비 수
+    # 상한에 닿았거나 읍면동 예산/공용 장비가 없는 창구는 더 받을 수 없으므로 힙에서 뺌
+    heap = []
+    for i, v in enumerate(voters):
+        heapq.heappush(heap, (-queue_load(v, alloc[i]), i))
+    while remaining > 0 and heap:
+        _, i = heapq.heappop(heap)
+        if alloc[i] >= caps[i]:
+            continue
+        g = group_of[i]
+        if group_used[g] >= group_budgets[g]:
+            if pool <= 0:
+                continue
+            pool -= 1
+        alloc[i] += 1
+        group_used[g] += 1
+        remaining -= 1
+        heapq.heappush(heap, (-queue_load(voters[i], alloc[i]), i))
+    return pool
+
+
+def _min_counts(voters, lam):
+    # 창구별 '부하 <= lam' 을 만족하는 최소 장비 수 (실수 나눗셈 비교로 보정)
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        c = np.where(voters > 0, np.maximum(np.ceil(voters / lam), 1.0), 0.0)
+        while True:
+            dec = (c > 1) & (voters / (c - 1) <= lam)
+            inc = (voters > 0) & (voters / c > lam)
+            if not dec.any() and not inc.any():
+                break
+            c = c - dec + inc
+    return c
+
+
+def exact_allocate(current_alloc, station_stats, remaining, weight_extra,
+                   caps=MAX_PER_QUEUE, groups=None, group_budgets=None, time_limit=5.0, cancel=None):
+    """
+    제약 조건이 있는 최대 부하 최소화(min-max) 배분의 최적해를 구합니다. (current_alloc 을 직접 갱신)
+    - current_alloc: 창구별 최소 장비 수 (예: 관내1/관외1, 제N사전투표소 관외 최소 대수 반영)
+    - caps: 창구별 최대 장비 수 (숫자 또는 {투표소: {'intra':, 'extra':}})
+    - groups / group_budgets: {투표소: 읍면동}, {읍면동: 기존 장비 수}
+      읍면동 안의 장비는 다른 읍면동으로 옮길 수 없고, 예산을 넘는 만큼은 공용 장비(전체 - 예산 합계, 최소 0)에서 씀
+      예비 장비를 늘려 전체가 예산 합계보다 적으면 공용 장비는 0 이고, 전체 장비 수 상한으로 따로 제한
+    최대 부하가 L 이하가 되려면 창구마다 장비가 ceil(투표자/L) 대 이상 필요하고 이 조건은 L 에 대해 단조이므로,
+    후보 값(투표자 / 가능한 장비 수) 전체를 정렬해 이분 탐색하면 정수 계획 문제의 최적값을 정확히 얻습니다.
+    제약 조건을 지키는 그리디 해로 탐색 상한을 먼저 좁히고(warm start), 최적 L 을 만족하는 최소 배분에
+    남은 장비를 다시 그리디로 채웁니다. time_limit(초)을 넘기거나 cancel(threading.Event)이 설정되면
+    그때까지의 최선 해를 반환합니다.
+    반환: {'max_load', 'lower_bound', 'gap', 'optimal', 'greedy_max_load'}
+    가능한 해가 없으면(최소 장비 > 상한, 가용 장비 부족) ValueError.
+    """
+    started = time.perf_counter()
+    stations = list(current_alloc)
+    voters, lows = _queues(current_alloc, station_stats, weight_extra)
+    n_q = len(voters)
+    if isinstance(caps, dict):
+        cap = np.array([caps.get(st, {}).get(r_type, MAX_PER_QUEUE) for st in stations for r_type in TYPES], dtype=float)
+    else:
+        cap = np.full(n_q, float(caps))
+
+    total = int(lows.sum()) + remaining
+    if groups is None:
+        group_of = [0] * n_q
+        budgets = {0: total}
+    else:
+        group_of = [groups.get(st) for st in stations for _ in TYPES]
+        budgets = {g: group_budgets.get(g, 0) for g in set(group_of)}
+    # [수정] 전체 < 예산 합계(예비 장비 증가 등)여도 가능한 해가 있으므로 공용 장비는 0 으로 두고 전체 상한을 따로 검사
+    pool = max(total - sum(budgets.values()), 0)
+    g_keys = list(budgets)
+    g_idx = np.array([g_keys.index(g) for g in group_of], dtype=int)
+    g_budget = np.array([budgets[g] for g in g_keys], dtype=float)
+
+    def _feasible(need):
+        if (need > cap).any() or need.sum() > total:
+            return False
+        g_need = np.bincount(g_idx, weights=need, minlength=len(g_keys))
+        return np.maximum(g_need - g_budget, 0).sum() <= pool
+
+    if not _feasible(lows):
+        raise ValueError("최소 장비 조건을 만족할 수 없습니다. (상한 / 가용 장비 / 읍면동 예산 확인)")
+
+    def _fill(counts):
+        # counts 에서 시작해 남은 장비를 그리디로 채운 배분 (리스트)
+        alloc = [int(c) for c in counts]
+        used = dict.fromkeys(g_keys, 0)
+        for i, c in enumerate(alloc):
+            used[group_of[i]] += c
+        left = pool - sum(max(used[g] - budgets[g], 0) for g in g_keys)
+        _constrained_greedy(alloc, voters.tolist(), cap.tolist(), group_of, used, budgets, left, total - sum(alloc))
+        return alloc
+
+    def _max_load(alloc):
+        return max((queue_load(v, c) for v, c in zip(voters, alloc)), default=0.0)
+
+    # 1) warm start: 제약 조건을 지키는 그리디 해
+    best = _fill(lows)
+    greedy_max = _max_load(best)
+    best_max, lower = greedy_max, 0.0
+
+    # 2) 후보 부하 값 (greedy 최대 부하 이하) 에서 가능한 가장 작은 값 탐색
+    pos = voters > 0
+    if pos.any():
+        # 한 창구가 받을 수 있는 장비는 상한과 (최소 장비 + 추가 가능 대수) 중 작은 값까지
+        c_range = np.arange(1, int(min(cap.max(), lows.max() + max(remaining, 0))) + 1, dtype=float)
+        cand = voters[pos][:, None] / c_range[None, :]
+        valid = (c_range[None, :] >= lows[pos][:, None]) & (c_range[None, :] <= cap[pos][:, None])
+        cand = np.unique(cand[valid & (cand <= greedy_max)])
+        lo, hi = -1, len(cand)  # cand[hi] 가능 (hi == len 은 그리디 해), cand[lo] 불가능
+        while hi - lo > 1:
+            if time.perf_counter() - started > time_limit or (cancel is not None and cancel.is_set()):
+                break
+            mid = (lo + hi) // 2
+            if _feasible(np.maximum(lows, _min_counts(voters, cand[mid]))):
+                hi = mid
+            else:
+                lo = mid
+        lower = cand[lo + 1] if lo + 1 < len(cand) else greedy_max
+        if hi < len(cand):
+            alloc = _fill(np.maximum(lows, _min_counts(voters, cand[hi])))
+            if _max_load(alloc) < best_max:
+                best, best_max = alloc, _max_load(alloc)
+    else:
+        lower = best_max
+
+    for order, st in enumerate(stations):
+        current_alloc[st]['intra'] = best[2 * order]
+        current_alloc[st]['extra'] = best[2 * order + 1]
+    gap = (best_max - lower) / best_max if best_max > 0 else 0.0
+    return {'max_load': float(best_max), 'lower_bound': float(lower), 'gap': float(gap),
+            'optimal': bool(gap <= 0), 'greedy_max_load': float(greedy_max)}
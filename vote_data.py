@@ -0,0 +1,900 @@
+# 사전투표 데이터 파일 공통 로더 (vote_program / vote_program(w_ballotbox) / vote_web 공용)
+import codecs
+import hashlib
+import io
+import itertools
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import openpyxl
+
+try:
+    # 선택 의존성: 설치되어 있으면 가장 빠른 엑셀 리더로 사용
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+# 파일 상단에서 [N일차], [HH:00] 태그와 헤더 행을 찾을 때 검사하는 행 수
+META_SCAN_ROWS = 10
+DEFAULT_HEADER_IDX = 3
+DEFAULT_HEADER_KEYS = ("사전투표소명", "읍면동명")
+# 분석에 실제로 쓰는 컬럼 (나머지 NEC 컬럼은 로드 시 버림)
+VOTE_COLUMNS = ['읍면동명', '사전투표소명', '관내사전투표자수', '관외사전투표자수']
+# 병렬 로딩은 프로세스 기동 비용이 있으므로 파일이 이 개수 이상일 때만 사용
+PARALLEL_MIN_FILES = 4
+# CSV 인코딩 판별 시 검사하는 앞부분 바이트 수
+ENCODING_PROBE_BYTES = 64 * 1024
+
+# 이 크기 이상의 CSV 는 청크 단위로 스트리밍 로딩 (필요 컬럼만 읽고 청크마다 합계 행 제거)
+STREAM_MIN_BYTES = 32 * 1024 * 1024
+STREAM_CHUNK_ROWS = 50000
+
+# 파일별 감지된 인코딩 캐시: {(경로, 수정시각, 크기): 인코딩}
+_ENCODING_CACHE = {}
+# 선거인수 파일 파싱 결과 캐시: {(경로, 수정시각, 크기): {읍면동명: 선거인수}}
+_ELECTORATE_CACHE = {}
+
+# 디스크 파싱 캐시: 전처리 로직(clean_vote_frame 등)이 바뀌면 버전을 올려 기존 캐시를 무효화
+PARSER_VERSION = 3
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_SUFFIX = '.pkl'
+
+
+def _source_name(src):
+    # 경로 문자열 또는 업로드 파일 객체(name 속성) 모두 지원
+    return src if isinstance(src, str) else getattr(src, 'name', '')
+
+
+def _read_bytes(src):
+    if isinstance(src, str):
+        with open(src, 'rb') as f:
+            return f.read()
+    src.seek(0)
+    return src.read()
+
+
+def file_signature(path):
+    # 파일 변경 감지용 (수정시각ns, 크기). 파일이 없으면 None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _encoding_cache_key(src):
+    # 경로는 (경로, 수정시각, 크기) 로 캐시. 업로드 파일 객체는 캐시하지 않음
+    if not isinstance(src, str):
+        return None
+    sig = file_signature(src)
+    if sig is None:
+        return None
+    return (os.path.abspath(src),) + sig
+
+
+def detect_encoding(raw):
+    # 1) BOM 확인  2) 앞부분 샘플이 UTF-8 로 깨짐 없이 읽히면 utf-8, 아니면 cp949
+    if raw.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if raw.startswith(codecs.BOM_UTF16_LE) or raw.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16'
+
+    sample = raw[:ENCODING_PROBE_BYTES]
+    try:
+        # final=False: 샘플 끝에서 잘린 멀티바이트 문자는 오류로 보지 않음
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp949'
+
+
+def read_csv_text(src):
+    # CSV 파일을 인코딩 감지 후 정확히 한 번만 디코딩하여 문자열로 반환
+    raw = _read_bytes(src)
+    key = _encoding_cache_key(src)
+    enc = _ENCODING_CACHE.get(key) if key else None
+    if enc is None:
+        enc = detect_encoding(raw)
+
+    try:
+        text = raw.decode(enc)
+    except UnicodeDecodeError:
+        # 샘플 이후에 깨진 바이트가 있는 드문 경우만 다른 인코딩으로 재시도
+        enc = 'cp949' if enc.startswith('utf-8') else 'utf-8'
+        text = raw.decode(enc)
+
+    if key:
+        _ENCODING_CACHE[key] = enc
+    return text
+
+
+def read_csv_auto(src, **kwargs):
+    # 공용 CSV 리더 (기존 cp949 -> utf-8 예외 재시도 방식 대체)
+    return pd.read_csv(io.StringIO(read_csv_text(src)), **kwargs)
+
+
+def _fast_excel_ok(src):
+    # openpyxl 은 .xlsx/.xlsm 만 지원 (.xls 는 calamine 이 있을 때만 빠른 경로 사용)
+    name = _source_name(src).lower()
+    return python_calamine is not None or name.endswith(('.xlsx', '.xlsm'))
+
+
+def iter_excel_rows(src):
+    """
+    엑셀 첫 시트의 값 행을 위에서부터 순서대로 돌려줍니다.
+    셀 서식/스타일 객체를 만들지 않는 읽기 전용 경로로, calamine 이 있으면 사용하고
+    없으면 openpyxl read_only/data_only 모드로 읽습니다.
+    각 행은 뒤쪽 빈 칸을 잘라낸 튜플이며 빈 칸은 None 입니다.
+    """
+    if not isinstance(src, str): src.seek(0)
+
+    if python_calamine is not None:
+        sheet = python_calamine.load_workbook(src).get_sheet_by_index(0)
+        for row in sheet.to_python(skip_empty_area=False):
+            row = [None if v == '' else (int(v) if isinstance(v, float) and v.is_integer() else v) for v in row]
+            while row and row[-1] is None:
+                row.pop()
+            yield tuple(row)
+        return
+
+    wb = openpyxl.load_workbook(src, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        # [수정] 저장된 시트 크기(<dimension>)가 틀린 파일(엑셀 외 프로그램 출력)도 끝까지 읽도록 크기 정보 무시
+        # (pd.read_excel 도 read_only 시트에서 같은 처리를 함)
+        ws.reset_dimensions()
+        for row in ws.iter_rows(values_only=True):
+            end = len(row)
+            while end and row[end - 1] is None:
+                end -= 1
+            yield row[:end]
+    finally:
+        wb.close()
+
+
+def _rows_to_frame(rows, columns=None):
+    # 값 행 목록 -> DataFrame (뒤쪽 빈 행 제거, 빈 칸은 NaN) : pd.read_excel 과 같은 모양
+    end = len(rows)
+    while end and not rows[end - 1]:
+        end -= 1
+    width = max([len(r) for r in rows[:end]] + [len(columns) if columns else 0])
+    df = pd.DataFrame(list(rows[:end]), columns=range(width) if columns is None else columns)
+    return df.where(df.notna(), np.nan)
+
+
+def read_excel_fast(src):
+    # pd.read_excel(src, header=None) 대체 (읽기 전용 경로를 쓸 수 없는 형식은 기존 방식)
+    if not _fast_excel_ok(src):
+        if not isinstance(src, str): src.seek(0)
+        return pd.read_excel(src, header=None)
+    return _rows_to_frame(list(iter_excel_rows(src)))
+
+
+def read_sheet(src, **kwargs):
+    # 엑셀/CSV 구분 없이 표 형태로 읽기 (장비현황, 선거인수 파일 등)
+    if _source_name(src).endswith('.csv'):
+        return read_csv_auto(src, **kwargs)
+    # [최적화] 헤더 없는 값 그리드 읽기는 읽기 전용 빠른 경로 사용
+    if kwargs == {'header': None}:
+        return read_excel_fast(src)
+    return pd.read_excel(src, **kwargs)
+
+
+def sniff_file_meta(df_meta, header_keys=DEFAULT_HEADER_KEYS):
+    # 상단 몇 줄(header=None 으로 읽은 값)에서 일차/시간 태그와 헤더 행 위치를 찾습니다.
+    day, time = None, None
+    header_idx = DEFAULT_HEADER_IDX
+
+    for idx, row in df_meta.iterrows():
+        row_str = " ".join(row.astype(str).values)
+        if day is None:
+            match_day = re.search(r'\[(\d+)일차\]', row_str)
+            match_time = re.search(r'\[(\d{1,2}):(\d{2})\]', row_str)
+            if match_day: day = int(match_day.group(1))
+            if match_time: time = int(match_time.group(1))
+        if any(key in row_str for key in header_keys):
+            header_idx = idx
+    return day, time, header_idx
+
+
+def _header_names(header_vals):
+    # pd.read_excel(header=N)과 같은 규칙: 빈 칸 -> 'Unnamed: i', 중복 -> '이름.1'
+    names = []
+    seen = {}
+    for i, val in enumerate(header_vals):
+        name = f"Unnamed: {i}" if pd.isna(val) else val
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _apply_header(raw, header_idx):
+    # header=None 으로 읽은 원본에서 header_idx 행을 컬럼명으로 올립니다.
+    header_vals = raw.iloc[header_idx].tolist() if header_idx < len(raw) else [None] * raw.shape[1]
+    body = raw.iloc[header_idx + 1:].reset_index(drop=True)
+    body.columns = _header_names(header_vals)
+    return body.infer_objects()
+
+
+def _read_vote_excel_rows(src, header_keys):
+    # 읽기 전용 경로: 상단 10행에서 태그/헤더를 찾고, 헤더 다음 행부터만 본문 DataFrame 으로 만듦
+    rows = iter_excel_rows(src)
+    head = list(itertools.islice(rows, META_SCAN_ROWS))
+    day, time, header_idx = sniff_file_meta(_rows_to_frame(head), header_keys)
+
+    if header_idx < len(head):
+        header = head[header_idx]
+        body = head[header_idx + 1:]
+        body.extend(rows)
+    else:
+        header, body = (), []
+        for _ in rows:
+            pass
+
+    width = max([len(r) for r in body] + [len(header)])
+    header = tuple(header) + (None,) * (width - len(header))
+    df = _rows_to_frame(body, columns=_header_names(header))
+    return day, time, df.infer_objects()
+
+
+def read_vote_file(src, header_keys=DEFAULT_HEADER_KEYS):
+    """
+    투표 데이터 파일을 한 번만 열어 메타정보와 본문을 함께 반환합니다.
+    반환값: (day, time, df)  -- 태그를 못 찾으면 day/time 은 None
+    """
+    name = _source_name(src)
+
+    if name.endswith('.csv'):
+        # CSV: 한 번 디코딩한 버퍼에서 상단 10줄과 본문을 모두 읽음
+        buf = io.StringIO(read_csv_text(src))
+        df_meta = pd.read_csv(buf, header=None, nrows=META_SCAN_ROWS)
+        day, time, header_idx = sniff_file_meta(df_meta, header_keys)
+        buf.seek(0)
+        df = pd.read_csv(buf, header=header_idx)
+    elif _fast_excel_ok(src):
+        # [최적화] 엑셀: 서식 없이 값만 읽는 읽기 전용 경로
+        day, time, df = _read_vote_excel_rows(src, header_keys)
+    else:
+        # 엑셀(.xls): 시트를 헤더 없이 한 번 파싱한 뒤 헤더 행을 찾아 본문으로 변환
+        if not isinstance(src, str): src.seek(0)
+        raw = pd.read_excel(src, header=None)
+        day, time, header_idx = sniff_file_meta(raw.head(META_SCAN_ROWS), header_keys)
+        df = _apply_header(raw, header_idx)
+
+    return day, time, df
+
+
+def clean_vote_frame(df):
+    # 공통 전처리: 투표소명 없는 행 / 합계·소계 행 제거 + 콤마 숫자 변환
+    # '사전투표소명' 컬럼이 없으면 None
+    if '사전투표소명' not in df.columns:
+        return None
+
+    df = df.dropna(subset=['사전투표소명'])
+    if '읍면동명' in df.columns:
+        temp_col = df['읍면동명'].astype(str).str.replace(' ', '')
+        mask = temp_col.str.contains('합계|소계|총계|누계', na=False)
+        df = df[~mask].copy()
+
+    for col in ['관내사전투표자수', '관외사전투표자수']:
+        if col in df.columns and df[col].dtype == 'object':
+            df[col] = df[col].astype(str).str.replace(',', '').str.strip()
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df[[c for c in VOTE_COLUMNS if c in df.columns]]
+
+
+def _probe_encoding(path):
+    # 파일 전체를 읽지 않고 앞부분만으로 인코딩 판별 (스트리밍 로딩용)
+    key = _encoding_cache_key(path)
+    enc = _ENCODING_CACHE.get(key) if key else None
+    if enc is None:
+        with open(path, 'rb') as f:
+            enc = detect_encoding(f.read(ENCODING_PROBE_BYTES))
+    return enc, key
+
+
+def _stream_vote_csv(path, enc, header_keys, chunksize):
+    with open(path, encoding=enc, newline='') as f:
+        df_meta = pd.read_csv(f, header=None, nrows=META_SCAN_ROWS)
+    day, time, header_idx = sniff_file_meta(df_meta, header_keys)
+    if day is None:
+        return day, time, None
+
+    parts = []
+    with open(path, encoding=enc, newline='') as f:
+        reader = pd.read_csv(f, header=header_idx, chunksize=chunksize,
+                             usecols=lambda c: c in VOTE_COLUMNS)
+        for chunk in reader:
+            chunk = clean_vote_frame(chunk)
+            if chunk is None:
+                return day, time, None
+            parts.append(chunk)
+
+    if not parts:
+        return day, time, pd.DataFrame(columns=VOTE_COLUMNS)
+    # 청크 인덱스는 파일 전체 기준으로 이어지므로 일반 로딩과 같은 인덱스가 유지됨
+    return day, time, pd.concat(parts)
+
+
+def read_vote_csv_stream(path, header_keys=DEFAULT_HEADER_KEYS, chunksize=STREAM_CHUNK_ROWS):
+    """
+    대용량 CSV 를 청크 단위로 읽어 전처리까지 마친 결과를 반환합니다.
+    파일 전체를 메모리에 올리지 않으므로 최대 메모리는 (청크 1개 + 정리된 결과) 수준입니다.
+    반환값: (day, time, df)  -- df 는 clean_vote_frame 결과 (투표소 컬럼이 없으면 None)
+    """
+    enc, key = _probe_encoding(path)
+    try:
+        result = _stream_vote_csv(path, enc, header_keys, chunksize)
+    except UnicodeDecodeError:
+        enc = 'cp949' if enc.startswith('utf-8') else 'utf-8'
+        result = _stream_vote_csv(path, enc, header_keys, chunksize)
+    if key:
+        _ENCODING_CACHE[key] = enc
+    return result
+
+
+def _parse_equip_count(col):
+    # 장비 수 문자열 정제: '(' 앞부분만, 콤마/'대' 제거 -> 정수 (해석 불가 시 1대)
+    txt = (col.astype(str).str.split('(').str[0]
+           .str.replace(',', '', regex=False).str.replace('대', '', regex=False).str.strip())
+    num = pd.to_numeric(txt, errors='coerce')
+    num = num.where(np.isfinite(num), 1)
+    return np.trunc(num).astype(int)
+
+
+def parse_equipment_sheet(df_raw):
+    """
+    장비현황 파일(헤더 없이 읽은 표)에서 지역명과 투표소별 장비 수를 추출합니다.
+    - 지역명: 3행에서 값이 있는 첫 번째 칸 (없으면 None, 3행이 없으면 '')
+    - 데이터: 상단 15행 중 C열에 '읍면동'/'투표소'가 있는 행 다음부터, C열=투표소명 / F열=관내 / G열=관외
+    반환값: (region_name, {투표소명: {'intra': n, 'extra': n}})
+    """
+    region_name = None
+    try:
+        for v in df_raw.iloc[2].astype(str).values:
+            v_clean = v.strip().replace('nan', '')
+            if v_clean:
+                region_name = v_clean
+                break
+    except Exception:
+        region_name = ""
+
+    # 데이터 시작 행 찾기 (C열에 '읍면동'이나 '투표소'가 나오는 줄의 다음 줄)
+    col_c = df_raw[2]
+    head_c = col_c.head(15).astype(str).str.replace(" ", "", regex=False)
+    hits = np.flatnonzero(head_c.str.contains("읍면동", regex=False) | head_c.str.contains("투표소", regex=False))
+    start_row_idx = int(hits[0]) + 1 if len(hits) else 0
+
+    body = df_raw.iloc[start_row_idx:]
+    names = body[2].astype(str).str.strip()
+    valid = ((names != 'nan') & (names != '')
+             & ~names.str.contains('합계', regex=False) & ~names.str.contains('소계', regex=False))
+
+    intra = _parse_equip_count(body[5][valid])
+    extra = _parse_equip_count(body[6][valid])
+    equip_map = {}
+    for st_name, i_cnt, e_cnt in zip(names[valid].tolist(), intra.tolist(), extra.tolist()):
+        equip_map[st_name] = {'intra': i_cnt, 'extra': e_cnt}
+    return region_name, equip_map
+
+
+def parse_electorate_sheet(df):
+    """
+    선거인수 파일(헤더 없이 읽은 표)에서 {읍면동명: 선거인수} 를 추출합니다.
+    상단 15행 중 A열에 '읍면동명'이 있는 행 다음부터, A열=읍면동명(공백 제거) / D열=선거인수.
+    D열은 "21,412\n(25, 12)" 처럼 줄바꿈이나 괄호 앞의 숫자만 사용하고, 0 이하/해석 불가 값은 제외합니다.
+    """
+    col_a = df[0]
+    head_a = col_a.head(15).astype(str)
+    hits = np.flatnonzero(head_a.str.contains("읍면동명", regex=False))
+    start_row = int(hits[0]) + 1 if len(hits) else 0
+
+    body = df.iloc[start_row:]
+    keys_raw = body[0].astype(str)
+    keys = keys_raw.str.strip().str.replace(" ", "", regex=False)
+    valid = (body[0].notna() & (keys_raw.str.strip() != '') & (keys_raw != 'nan')
+             & ~keys.str.contains('합계', regex=False) & ~keys.str.contains('소계', regex=False))
+
+    v_str = body[3][valid].astype(str).str.extract(r'^([^\n(]*)', expand=False)
+    values = pd.to_numeric(v_str.str.replace(',', '', regex=False).str.strip(), errors='coerce')
+    keep = values > 0
+    return dict(zip(keys[valid][keep].tolist(), values[keep].tolist()))
+
+
+def load_electorate_file(path):
+    # 선거인수 파일을 읽어 {읍면동명: 선거인수} 반환 (파일이 바뀌지 않았으면 이전 결과 재사용)
+    key = _encoding_cache_key(path)
+    if key in _ELECTORATE_CACHE:
+        return _ELECTORATE_CACHE[key]
+    data_map = parse_electorate_sheet(read_sheet(path, header=None))
+    if key:
+        _ELECTORATE_CACHE[key] = data_map
+    return data_map
+
+
+def normalize_name(name):
+    # 이름 비교용 정규화 (모든 공백 제거)
+    return re.sub(r'\s+', '', str(name))
+
+
+class _AhoCorasick:
+    # 여러 패턴을 한 번의 문자열 스캔으로 모두 찾는 Aho-Corasick 오토마톤 (패턴은 인덱스로 보고)
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for idx, pat in enumerate(patterns):
+            if not pat:
+                continue
+            node = 0
+            for ch in pat:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[node][ch] = nxt
+                node = nxt
+            self.out[node].append(idx)
+
+        # 실패 링크: 너비 우선으로 얕은 노드부터 계산
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter_matches(self, text):
+        # text 안에 들어 있는 패턴 인덱스를 (중복 포함) 모두 돌려줌
+        node = 0
+        goto, fail, out = self.goto, self.fail, self.out
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                yield from out[node]
+
+
+class NameMatcher:
+    """
+    투표소명 <-> 장비현황/읍면동명 키 매칭용 색인.
+    1) 원문 일치  2) 공백 제거 후 일치(해시)  3) 키가 이름 안에 포함 (Aho-Corasick, 가장 긴 키)
+    4) reverse=True 이면 이름이 키 안에 포함되는 경우도 허용 (가장 짧은 키)
+    같은 길이면 파일 순서상 먼저 나온 키를 선택하므로 결과가 항상 같습니다.
+    """
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.norm_keys = [normalize_name(k) for k in self.keys]
+        self.raw_index = {}
+        self.norm_index = {}
+        for i, (k, nk) in enumerate(zip(self.keys, self.norm_keys)):
+            self.raw_index.setdefault(k, i)
+            self.norm_index.setdefault(nk, i)
+        self.automaton = _AhoCorasick(self.norm_keys)
+
+    def _exact(self, name):
+        i = self.raw_index.get(name)
+        if i is None:
+            i = self.norm_index.get(normalize_name(name))
+        return i
+
+    def find(self, name):
+        # 이름 하나에 대해 (원문/정규화 일치 -> 이름 안에 포함된 가장 긴 키) 순으로 찾음. 없으면 None
+        i = self._exact(name)
+        if i is None:
+            best = None
+            for k in self.automaton.iter_matches(normalize_name(name)):
+                cand = (-len(self.norm_keys[k]), k)
+                if best is None or cand < best:
+                    best = cand
+            i = best[1] if best else None
+        return None if i is None else self.keys[i]
+
+    def match_many(self, names, reverse=False):
+        # 여러 이름을 한꺼번에 매칭 -> {이름: 키 또는 None}
+        result = {name: self.find(name) for name in names}
+        if reverse:
+            # 남은 이름들로 오토마톤을 만들어 키 전체를 한 번씩만 스캔 (이름이 키 안에 포함되는 경우)
+            rest = [name for name, key in result.items() if key is None]
+            norm_rest = [normalize_name(name) for name in rest]
+            if rest and any(norm_rest):
+                rev = _AhoCorasick(norm_rest)
+                best = {}
+                for k, nk in enumerate(self.norm_keys):
+                    for j in set(rev.iter_matches(nk)):
+                        cand = (len(nk), k)
+                        if j not in best or cand < best[j]:
+                            best[j] = cand
+                for j, (_, k) in best.items():
+                    result[rest[j]] = self.keys[k]
+        return result
+
+
+@lru_cache(maxsize=8)
+def _cached_matcher(keys):
+    return NameMatcher(keys)
+
+
+def get_matcher(keys):
+    # 같은 키 목록(같은 파일 내용)이면 이전에 만든 색인을 재사용
+    return _cached_matcher(tuple(keys))
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_path(cache_dir, path):
+    # 캐시 키 = 파일 내용 해시 + 파서 버전 (파일명/경로가 바뀌어도 내용이 같으면 재사용)
+    return os.path.join(cache_dir, f"{_file_digest(path)}_v{PARSER_VERSION}{CACHE_SUFFIX}")
+
+
+def _cache_load(cache_file):
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        value = pd.read_pickle(cache_file)
+    except Exception:
+        return None
+    try:
+        os.utime(cache_file)  # LRU: 최근 사용 시각 갱신
+    except OSError:
+        pass
+    return value
+
+
+def _cache_store(cache_file, value):
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    # 병렬 로딩 중 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    pd.to_pickle(value, tmp_file)
+    os.replace(tmp_file, cache_file)
+
+
+def prune_cache(cache_dir, max_bytes=CACHE_MAX_BYTES):
+    # 캐시 폴더 용량이 max_bytes 를 넘으면 가장 오래 사용하지 않은 파일부터 삭제
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return 0
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(CACHE_SUFFIX):
+            full = os.path.join(cache_dir, name)
+            st = os.stat(full)
+            entries.append((st.st_mtime, st.st_size, full))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, full in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(full)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def clear_cache(cache_dir):
+    # 캐시 폴더의 파싱 캐시 파일을 모두 삭제하고 삭제 개수를 반환
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return 0
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if name.endswith(CACHE_SUFFIX) or name.endswith('.tmp'):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def load_vote_file(path, cache_dir=None):
+    # 파일 1개를 읽어 (df, day, time) 반환. 일차 태그나 투표소 컬럼이 없으면 None
+    # cache_dir 가 주어지면 디스크 캐시를 먼저 확인하고, 없으면 파싱 후 저장
+    # (프로세스 풀에서 호출되므로 모듈 최상위 함수로 둠)
+    cache_file = _cache_path(cache_dir, path) if cache_dir else None
+    if cache_file:
+        cached = _cache_load(cache_file)
+        if cached is not None:
+            return cached
+
+    if path.endswith('.csv') and os.path.getsize(path) >= STREAM_MIN_BYTES:
+        # [최적화] 대용량 CSV 는 청크 스트리밍 (읽으면서 바로 전처리)
+        day, time, df = read_vote_csv_stream(path)
+    else:
+        day, time, df = read_vote_file(path)
+        if day is not None:
+            df = clean_vote_frame(df)
+    if day is None or df is None:
+        return None
+
+    result = (df, day, time)
+    if cache_file:
+        try:
+            _cache_store(cache_file, result)
+        except OSError:
+            pass  # 캐시 저장 실패는 무시 (읽기 전용 폴더 등)
+    return result
+
+
+def load_vote_files(paths, workers=1, log=None, cache_dir=None, cache_max_bytes=CACHE_MAX_BYTES):
+    """
+    여러 투표 데이터 파일을 읽어 {경로: (df, day, time)} 를 반환합니다.
+    workers > 1 이면 프로세스 풀에서 병렬로 파싱하고, 결과는 항상 paths 순서로 담습니다.
+    log: 파일별 진행 상황/오류를 받을 함수 (예: app.log)
+    cache_dir: 디스크 파싱 캐시 폴더 (None 이면 사용 안 함)
+    """
+    log = log or (lambda msg: None)
+    paths = list(paths)
+    total = len(paths)
+    results = {}
+
+    if workers > 1 and total >= PARALLEL_MIN_FILES:
+        done = 0
+        with ProcessPoolExecutor(max_workers=min(workers, total)) as pool:
+            futures = {pool.submit(load_vote_file, p, cache_dir): p for p in paths}
+            for fut in as_completed(futures):
+                path = futures[fut]
+                done += 1
+                try:
+                    results[path] = fut.result()
+                    log(f"파일 로드 ({done}/{total}): {os.path.basename(path)}")
+                except Exception as e:
+                    log(f"파일 로드 실패({os.path.basename(path)}): {e}")
+    else:
+        for i, path in enumerate(paths, 1):
+            try:
+                results[path] = load_vote_file(path, cache_dir)
+                log(f"파일 로드 ({i}/{total}): {os.path.basename(path)}")
+            except Exception as e:
+                log(f"파일 로드 실패({os.path.basename(path)}): {e}")
+
+    # 캐시 정리는 모든 작업이 끝난 뒤 메인 프로세스에서만 수행
+    if cache_dir:
+        prune_cache(cache_dir, cache_max_bytes)
+
+    # 완료 순서와 무관하게 파일 선택 순서대로 정렬 (사용 불가 파일 제외)
+    return {p: results[p] for p in paths if results.get(p) is not None}
+
+
+class SnapshotStore:
+    """
+    시간대별 누적 투표자 수 스냅샷을 [투표소, 일차, 시간대] 배열로 압축한 저장소.
+    - stations: 투표소명 목록 (파일 순서상 첫 등장 순, 인덱스 = 투표소 코드)
+    - dongs: 투표소별 읍면동명 (첫 등장 값)
+    - days / hours: 정렬된 일차 / 시간대 값
+    - intra / extra: 관내 / 관외 누적 투표자 수 (float64, 값이 없는 칸은 NaN)
+    - present: 해당 (투표소, 일차, 시간대) 행이 파일에 실제로 있었는지 여부
+    """
+
+    def __init__(self, stations, dongs, days, hours, intra, extra, present):
+        self.stations = stations
+        self.dongs = dongs
+        self.days = days
+        self.hours = hours
+        self.intra = intra
+        self.extra = extra
+        self.present = present
+        self.codes = {name: i for i, name in enumerate(stations)}
+        self._base = None  # to_frame 기본 단계 캐시 (파일 데이터에만 의존)
+
+    @classmethod
+    def from_frames(cls, entries):
+        # entries: 파일 순서대로의 (df, day, time) 목록 (cached_data 값)
+        # 같은 (투표소, 일차, 시간대)가 여러 번 나오면 먼저 나온 값을 사용
+        parts = []
+        for df, day, time in entries:
+            if time is None or '사전투표소명' not in df.columns:
+                continue
+            part = pd.DataFrame({
+                'name': df['사전투표소명'].astype(str).str.strip().values,
+                'dong': df['읍면동명'].values if '읍면동명' in df.columns else None,
+                'intra': pd.to_numeric(df.get('관내사전투표자수'), errors='coerce'),
+                'extra': pd.to_numeric(df.get('관외사전투표자수'), errors='coerce'),
+            })
+            part['day'] = day
+            part['hour'] = time
+            parts.append(part)
+
+        if parts:
+            long_df = pd.concat(parts, ignore_index=True)
+            long_df = long_df[(long_df['name'] != '') & (long_df['name'] != 'nan')]
+        if not parts or long_df.empty:
+            empty = np.zeros((0, 0, 0))
+            return cls([], [], np.array([], dtype=int), np.array([], dtype=int),
+                       empty, empty.copy(), empty.astype(bool))
+
+        # 투표소명 -> 정수 코드 (첫 등장 순서 유지)
+        st_codes, stations = pd.factorize(long_df['name'], sort=False)
+        days = np.unique(long_df['day'].to_numpy(dtype=int))
+        hours = np.unique(long_df['hour'].to_numpy(dtype=int))
+        d_idx = np.searchsorted(days, long_df['day'].to_numpy(dtype=int))
+        h_idx = np.searchsorted(hours, long_df['hour'].to_numpy(dtype=int))
+
+        shape = (len(stations), len(days), len(hours))
+        flat = np.ravel_multi_index((st_codes, d_idx, h_idx), shape)
+        _, first = np.unique(flat, return_index=True)  # 중복 칸은 첫 행만 사용
+
+        intra = np.full(shape, np.nan)
+        extra = np.full(shape, np.nan)
+        present = np.zeros(shape, dtype=bool)
+        intra.flat[flat[first]] = long_df['intra'].to_numpy(dtype=float)[first]
+        extra.flat[flat[first]] = long_df['extra'].to_numpy(dtype=float)[first]
+        present.flat[flat[first]] = True
+
+        dong_first = long_df.groupby(st_codes, sort=True)['dong'].first()
+        dongs = [dong_first.get(i) for i in range(len(stations))]
+        return cls(list(stations), dongs, days, hours, intra, extra, present)
+
+    def factors(self, station_data):
+        # 투표소별 (관내, 관외) 증감 계수 배열
+        # 관내 = (1 + 선거인수 변동률) x (1 + 관내 조정률), 관외 = (1 + 관외 조정률)
+        f_intra = np.ones(len(self.stations))
+        f_extra = np.ones(len(self.stations))
+        for i, name in enumerate(self.stations):
+            d = station_data.get(name)
+            if d is None:
+                continue
+            f_intra[i] = (1 + d.get('elect_rate', 0) / 100.0) * (1 + d.get('rate_intra', 0) / 100.0)
+            f_extra[i] = (1 + d.get('rate_extra', 0) / 100.0)
+        return f_intra, f_extra
+
+    def scaled(self, f_intra, f_extra):
+        # 증감 계수를 곱한 (관내, 관외) 누적 배열
+        return self.intra * f_intra[:, None, None], self.extra * f_extra[:, None, None]
+
+    def day_max_totals(self):
+        # 투표소별로 일차마다 최대 누적값(=그날 최종 투표자 수)을 구해 일차 합산 -> (관내[S], 관외[S])
+        def _total(arr):
+            day_max = np.fmax.reduce(np.where(self.present, arr, np.nan), axis=2, initial=-np.inf)
+            day_max[~np.isfinite(day_max)] = 0
+            return day_max.sum(axis=1)
+        if not self.stations:
+            return np.zeros(0), np.zeros(0)
+        return _total(self.intra), _total(self.extra)
+
+    def _prev_hour_index(self, present=None):
+        # 각 칸에서 같은 날 '직전에 데이터가 있던 시간대' 인덱스 (없으면 -1)
+        present = self.present if present is None else present
+        pos = np.where(present, np.arange(len(self.hours)), -1)
+        last = np.maximum.accumulate(pos, axis=2)
+        return np.concatenate([np.full(last.shape[:2] + (1,), -1), last[:, :, :-1]], axis=2)
+
+    def slot_hours(self, present=None):
+        # 각 칸의 순증가분이 쌓인 구간 길이 [시간] (같은 날 직전 데이터 시간대 ~ 해당 시간대, 첫 칸은 1시간)
+        present = self.present if present is None else present
+        prev = self._prev_hour_index(present)
+        hours = self.hours.astype(float)
+        width = np.where(prev >= 0, hours - hours[np.maximum(prev, 0)], 1.0)
+        return np.where(present, np.maximum(width, 1.0), np.nan)
+
+    def hourly_deltas(self, intra, extra, present=None):
+        """
+        누적 배열 -> 시간대별 순증가분 배열 (관내, 관외).
+        같은 날 바로 앞의 '데이터가 있는' 시간대와의 차이이며, 그날 첫 시간대는 누적값 그대로입니다.
+        (정렬된 데이터에 groupby(['사전투표소명', '일차']).diff() 후 첫 행을 누적값으로 채운 것과 같음)
+        데이터가 없는 칸은 NaN. present 를 주면 self.present 대신 그 마스크를 사용합니다.
+        """
+        present = self.present if present is None else present
+        if not present.size:
+            return intra.copy(), extra.copy()
+        prev = self._prev_hour_index(present)
+
+        def _delta(arr):
+            prev_val = np.take_along_axis(arr, np.maximum(prev, 0), axis=2)
+            prev_val = np.where(prev >= 0, prev_val, 0.0)
+            return np.where(present, arr - prev_val, np.nan)
+        return _delta(intra), _delta(extra)
+
+    def _merge_days(self, intra, extra):
+        # 일차 구분 없이 시간대만으로 합친 [투표소, 1, 시간대] 배열
+        # 같은 시간대가 여러 일차에 있으면 뒤 일차 값을 사용
+        # (예전 vote_program 루프는 파일 선택 순서상 나중 파일 값으로 덮어썼으므로, 2일차 파일을 먼저 고른 경우 결과가 다름)
+        day_pos = np.where(self.present, np.arange(len(self.days))[None, :, None], -1)
+        last_day = day_pos.max(axis=1, initial=-1)[:, None, :]
+        pick = np.maximum(last_day, 0)
+        return (np.take_along_axis(intra, pick, axis=1), np.take_along_axis(extra, pick, axis=1),
+                last_day >= 0)
+
+    def load_profile(self, f_intra, f_extra, window=(11, 18), top_k=3, by_day=True):
+        """
+        투표소별 시간대 부하 집계 (자동 배분 / 물품 소요량 공용).
+        반환 dict (배열의 첫 축 = 투표소 코드):
+        - delta_intra / delta_extra: [투표소, 일차, 시간대] 순증가분 (음수/결측은 0)
+        - window_intra / window_extra: window 시간대(양 끝 포함) 순증가분 합계
+        - peak_intra / peak_extra: 순증가분 상위 top_k 개 평균 (데이터가 top_k 개보다 적으면 나머지는 0으로 계산)
+        - has_data: 데이터가 한 칸이라도 있는 투표소 여부
+        by_day=False 이면 일차를 구분하지 않고 시간대별로 합친 뒤(뒤 일차 우선) 순증가분을 구합니다.
+        합계는 (일차, 시간대) 순서로 한 칸씩 더해 기존 행 단위 누적과 같은 값이 나옵니다.
+        """
+        intra, extra = self.scaled(f_intra, f_extra)
+        present = self.present
+        if not by_day:
+            intra, extra, present = self._merge_days(intra, extra)
+        n_st = len(self.stations)
+        if not n_st:
+            empty = np.zeros(0)
+            return {'has_data': empty.astype(bool),
+                    'delta_intra': self.intra.copy(), 'delta_extra': self.extra.copy(),
+                    'window_intra': empty, 'window_extra': empty, 'peak_intra': empty, 'peak_extra': empty}
+        profile = {'has_data': present.reshape(n_st, -1).any(axis=1)}
+        in_window = np.nonzero((self.hours >= window[0]) & (self.hours <= window[1]))[0]
+
+        for key, delta in zip(('intra', 'extra'), self.hourly_deltas(intra, extra, present)):
+            delta = np.where(delta > 0, delta, 0.0)
+            total = np.zeros(n_st)
+            for d in range(delta.shape[1]):
+                for h in in_window:
+                    total += delta[:, d, h]
+
+            flat = np.sort(delta.reshape(n_st, -1), axis=1)[:, ::-1]
+            peak = np.zeros(n_st)
+            for k in range(min(top_k, flat.shape[1])):
+                peak += flat[:, k]
+
+            profile['delta_' + key] = delta
+            profile['window_' + key] = total
+            profile['peak_' + key] = peak / top_k
+        return profile
+
+    def _frame_base(self):
+        # 기본 단계: 파일 데이터에만 의존하는 부분 (칸 위치, 직전 시간대 위치, 투표소/일차/시간대 컬럼)
+        # 조정률/장비 수가 바뀌어도 그대로이므로 한 번만 계산해 재사용
+        if self._base is None:
+            s_idx, d_idx, h_idx = np.nonzero(self.present)
+            prev_h = self._prev_hour_index()[s_idx, d_idx, h_idx] if len(s_idx) else np.zeros(0, dtype=int)
+            base = pd.DataFrame({
+                '읍면동명': np.array(self.dongs, dtype=object)[s_idx] if len(s_idx) else [],
+                '사전투표소명': pd.Categorical.from_codes(s_idx, categories=self.stations, ordered=True),
+                '일차': self.days[d_idx],
+                '시간대': self.hours[h_idx],
+            })
+            self._base = (s_idx, d_idx, h_idx, prev_h, base)
+        return self._base
+
+    def to_frame(self, f_intra=None, f_extra=None, deltas=False):
+        # 실제 데이터가 있는 칸만 (투표소, 일차, 시간대) 순으로 펼친 긴 형식 DataFrame
+        # 투영 단계: 캐시된 기본 단계에 증감 계수만 곱함 (deltas=True 이면 시간대별 순증가분 컬럼도 채움)
+        s_idx, d_idx, h_idx, prev_h, base = self._frame_base()
+        if f_intra is None:
+            f_intra = np.ones(len(self.stations))
+            f_extra = np.ones(len(self.stations))
+
+        df = base.copy()
+        delta_cols = {}
+        for pos, (col, d_col, arr, f) in enumerate([
+                ('관내사전투표자수', '시간대별_관내투표자수', self.intra, f_intra),
+                ('관외사전투표자수', '시간대별_관외투표자수', self.extra, f_extra)]):
+            f_cell = f[s_idx]
+            cur = arr[s_idx, d_idx, h_idx] * f_cell
+            df.insert(2 + pos, col, cur)
+            if deltas:
+                prev_val = np.where(prev_h >= 0, arr[s_idx, d_idx, np.maximum(prev_h, 0)] * f_cell, 0.0)
+                delta_cols[d_col] = cur - prev_val
+        for d_col, values in delta_cols.items():
+            df[d_col] = values
+        return df
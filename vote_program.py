@@ -3,6 +3,7 @@ import pandas as pd
 import re
 import os
 import threading
+import multiprocessing
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk, simpledialog
 from datetime import datetime
@@ -16,6 +17,9 @@ from matplotlib.colors import ListedColormap
 from openpyxl.styles import PatternFill, Border, Side, Alignment, Font
 from openpyxl.formatting.rule import ColorScaleRule
 from openpyxl.utils import get_column_letter
+from vote_data import load_vote_files, read_sheet, clear_cache, file_signature, SnapshotStore, parse_equipment_sheet, load_electorate_file, get_matcher
+from vote_alloc import bulk_allocate, budget_sweep, estimate_extra_weight, exact_allocate, MAX_PER_QUEUE
+from vote_sim import monte_carlo_bands, simulate_waits, required_booths, erlang_c
 
 class ElectionAnalyzerApp:
     def __init__(self, root):
@@ -25,6 +29,16 @@ class ElectionAnalyzerApp:
         self.root.resizable(False, True) 
         self.vote_files = []
         self.cached_data = {} 
+        self.cached_sigs = {} # [추가] 파일별 (수정시각, 크기) - 캐시 유효성 검사용
+        self.snapshots = None # [추가] 투표소 x 일차 x 시간대 압축 저장소 (SnapshotStore)
+        # [추가] 투표 데이터 병렬 로딩 프로세스 수 (1이면 순차 로딩, 화면의 '병렬 처리 프로세스 수'로 변경)
+        self.load_workers = max(1, (os.cpu_count() or 1) - 1)
+        # [추가] 디스크 파싱 캐시 폴더 (실행 파일/스크립트 위치 기준, 재실행 시에도 재사용)
+        if getattr(sys, 'frozen', False):
+            base_dir = os.path.dirname(os.path.abspath(sys.executable))
+        else:
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.cache_dir = os.path.join(base_dir, "parse_cache")
         self.equipment_file = None
         self.file_past_elect = None   
         self.file_recent_elect = None 
@@ -32,6 +46,19 @@ class ElectionAnalyzerApp:
         self.region_name = "" # [추가] 지역명 저장 변수 (예: 서울 성동구)
 
         self.last_reserve_count = 5
+        # 관외 업무 가중치 (자동 배분 팝업에서 변경/데이터 추정 가능, 기본값 1.156): 자동 배분 시 관외 투표자 수에 곱해 부하를 더 높게 평가
+        self.weight_extra = 1.156
+        # 정확 최적화 모드에서 제2사전투표소 이상(분소)에 둘 관외 장비 최소 대수
+        self.min_extra_branch = 2
+        # 자동 배분 기준 ('window': 11~18시 합계, 'peak': 가장 붐비는 시간대, 'peak_p90': 몬테카를로 P90)
+        self.balance_strategy = 'window'
+        # 몬테카를로 불확실성 시뮬레이션 시행 횟수 / 난수 시드 (시드가 같으면 결과 재현)
+        self.mc_draws = 1000
+        self.mc_seed = 2024
+        self._mc_cache = None # [추가] (저장소, (계수, 시드, 시행 수), 결과) - 장비 수만 바꾼 재분석은 재사용
+        # 대기시간 시뮬레이션: 1인당 발급 시간(초) / 1인당 기표 시간(초, 0 이면 기표대 단계 생략)
+        self.service_sec = {'intra': 30, 'extra': 35}
+        self.booth_sec = {'intra': 0, 'extra': 0}
         self.station_data = {} 
         
         self.create_widgets()
@@ -110,6 +137,10 @@ class ElectionAnalyzerApp:
         ttk.Separator(frame_data, orient="horizontal").pack(fill="x", pady=(10, 5))
         btn_reset = ttk.Button(frame_data, text="🔄 모든 데이터 초기화", command=self.reset_all)
         btn_reset.pack(fill="x", ipady=3)
+        # [추가] 디스크 파싱 캐시 삭제 버튼
+        btn_cache = ttk.Button(frame_data, text="🧹 파싱 캐시 비우기", command=self.clear_parse_cache)
+        btn_cache.pack(fill="x", ipady=3, pady=(5, 0))
+        self._build_workers_input(frame_data).pack(fill="x", pady=(5, 0))
         
         # 2. 시뮬레이션 설정
         frame_sim = ttk.LabelFrame(content_frame, text=" 2. 시뮬레이션 설정 (데이터 튜닝) ", padding="10")
@@ -135,12 +166,16 @@ class ElectionAnalyzerApp:
         ttk.Label(frame_balance, text="📋 투표소별 설정 (수정: 더블클릭)", font=("맑은 고딕", 9, "bold")).pack(side="left")
         btn_balance = ttk.Button(frame_balance, text="⚖️ 장비 자동 배분", command=self.open_balance_popup)
         btn_balance.pack(side="right")
+        # [추가] 발급/기표 대기열 시뮬레이션 (투표소 x 시간대별 평균/95% 대기시간)
+        btn_wait = ttk.Button(frame_balance, text="⏱ 대기시간", command=self.open_wait_popup)
+        btn_wait.pack(side="right", padx=(0, 5))
 
         tree_frame = ttk.Frame(frame_sim)
         tree_frame.pack(fill="both", expand=True, pady=5)
         
         # [수정] 조정률 컬럼 통합 (rate_merged)
-        columns = ("station", "elect_diff", "intra", "extra", "rate_merged")
+        # [추가] 예상대기: 해석식(Erlang-C) 최대 평균 대기시간 (관내/관외)
+        columns = ("station", "elect_diff", "intra", "extra", "rate_merged", "wait")
         self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=12)
         
         self.tree.heading("station", text="투표소명")
@@ -149,6 +184,7 @@ class ElectionAnalyzerApp:
         self.tree.heading("extra", text="관외장비")
         # [변경] 헤더 텍스트 수정
         self.tree.heading("rate_merged", text="조정률(관내/외)") 
+        self.tree.heading("wait", text="예상대기(분)")
         
         self.tree.column("station", width=150)
         self.tree.column("elect_diff", width=90, anchor="center")
@@ -156,6 +192,7 @@ class ElectionAnalyzerApp:
         self.tree.column("extra", width=60, anchor="center")
         # [변경] 글자가 길어지므로 너비를 120 -> 150으로 확대
         self.tree.column("rate_merged", width=150, anchor="center")
+        self.tree.column("wait", width=90, anchor="center")
         
         scrollbar_tree = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
         self.tree.configure(yscrollcommand=scrollbar_tree.set)
@@ -211,6 +248,8 @@ class ElectionAnalyzerApp:
         # 2. 내부 데이터 변수 초기화
         self.vote_files = []
         self.cached_data = {} 
+        self.cached_sigs = {}
+        self.snapshots = None
         self.equipment_file = None
         self.file_past_elect = None   
         self.file_recent_elect = None 
@@ -234,6 +273,29 @@ class ElectionAnalyzerApp:
         self.log("=== 모든 데이터가 초기화되었습니다 ===")
         messagebox.showinfo("완료", "초기화되었습니다.")    
 
+    def _build_workers_input(self, parent):
+        # [추가] 병렬 처리 프로세스 수 입력 (투표 데이터 로딩 / 대기시간 시뮬레이션 공용, 1 이면 순차 처리)
+        frame = ttk.Frame(parent)
+        ttk.Label(frame, text="⚙ 병렬 처리 프로세스 수:").pack(side="left")
+        self.var_workers = tk.StringVar(value=str(self.load_workers))
+        ttk.Spinbox(frame, from_=1, to=max(1, os.cpu_count() or 1), textvariable=self.var_workers,
+                    width=5, justify="center").pack(side="right")
+
+        def _on_change(*args):
+            try:
+                self.load_workers = max(1, int(self.var_workers.get()))
+            except ValueError:
+                pass  # 입력 중(빈 칸 등)에는 기존 값 유지
+        self.var_workers.trace_add("write", _on_change)
+        return frame
+
+    def clear_parse_cache(self):
+        # [추가] 디스크에 저장된 파싱 캐시 삭제 (메모리에 로드된 데이터는 유지)
+        if not messagebox.askyesno("캐시 비우기", "저장된 파싱 캐시를 모두 삭제하시겠습니까?\n(다음 실행 시 투표 데이터 파일을 다시 읽습니다.)"):
+            return
+        removed = clear_cache(self.cache_dir)
+        self.log(f"파싱 캐시 삭제 완료: {removed}개 파일")
+
     def select_past_file(self):
         file = filedialog.askopenfilename(title="과거 선거인수 파일 (A열:동명, B열:인수)", filetypes=[("Excel Files", "*.xlsx *.xls")])
         if file:
@@ -301,12 +363,16 @@ class ElectionAnalyzerApp:
 
                 # 컬럼 5개 반영
                 self.tree.item(item_id, values=(st_name, elect_disp, disp_intra, disp_extra, rate_txt))
+        self._refresh_wait_column()
 
     def select_vote_files(self):
         files = filedialog.askopenfilenames(title="투표 데이터 선택", filetypes=[("Excel/CSV Files", "*.xlsx *.xls *.csv")])
         if files:
             self.vote_files = files
-            self.cached_data = {} # [최적화] 새 파일 선택 시 캐시 초기화
+            # [수정] 선택에서 빠진 파일만 캐시에서 제거 (내용이 바뀐 파일은 _ensure_data_loaded 에서 재로드)
+            self.cached_data = {f: v for f, v in self.cached_data.items() if f in files}
+            self.cached_sigs = {f: v for f, v in self.cached_sigs.items() if f in files}
+            self.snapshots = None
             self.lbl_file_count.config(text=f"✅ {len(files)}개 파일 로드됨", foreground="blue")
             self.log(f"{len(files)}개 파일 선택됨. 데이터 로드 및 스캔 시작...")
             self.scan_stations()
@@ -320,38 +386,29 @@ class ElectionAnalyzerApp:
             self.scan_stations() 
 
     def _ensure_data_loaded(self):
-        # [최적화] 파일이 캐시에 없으면 읽어서 저장
+        # [최적화] 캐시에 없거나 (수정시각, 크기)가 바뀐 파일만 다시 읽음 (load_workers > 1 이면 병렬 로딩)
+        pending = []
         for file in self.vote_files:
+            sig = file_signature(file)
             if file in self.cached_data:
-                continue
-                
-            try:
-                day, time, header_row = self.get_file_info_header(file)
-                if day is None: continue
+                if self.cached_sigs.get(file) == sig:
+                    continue
+                self.log(f"변경된 파일 다시 로드: {os.path.basename(file)}")
+                del self.cached_data[file]
+            self.cached_sigs[file] = sig
+            pending.append(file)
+        if not pending and self.snapshots is not None:
+            return
 
-                if file.endswith('.csv'):
-                    try: df = pd.read_csv(file, header=header_row, encoding='cp949')
-                    except: df = pd.read_csv(file, header=header_row, encoding='utf-8')
-                else:
-                    df = pd.read_excel(file, header=header_row)
-
-                if '사전투표소명' in df.columns:
-                    df = df.dropna(subset=['사전투표소명'])
-                    # 공통 전처리: 합계/소계 제거
-                    if '읍면동명' in df.columns:
-                        temp_col = df['읍면동명'].astype(str).str.replace(' ', '')
-                        mask = temp_col.str.contains('합계|소계|총계|누계', na=False)
-                        df = df[~mask].copy()
-                    
-                    # 숫자 변환 미리 수행
-                    for col in ['관내사전투표자수', '관외사전투표자수']:
-                        if col in df.columns and df[col].dtype == 'object':
-                            df[col] = df[col].astype(str).str.replace(',', '').str.strip()
-                            df[col] = pd.to_numeric(df[col], errors='coerce')
+        if pending:
+            loaded = load_vote_files(pending, workers=self.load_workers, log=self.log, cache_dir=self.cache_dir)
+            for file in pending:
+                if file in loaded:
+                    self.cached_data[file] = loaded[file]
 
-                    self.cached_data[file] = (df, day, time)
-            except Exception as e:
-                self.log(f"파일 로드 실패({os.path.basename(file)}): {e}")
+        # [추가] 파일별 DataFrame -> 투표소 x 일차 x 시간대 배열로 한 번만 압축 (이후 분석은 이 저장소를 사용)
+        self.snapshots = SnapshotStore.from_frames(
+            [self.cached_data[f] for f in self.vote_files if f in self.cached_data])
 
     def scan_stations(self):
         if not self.vote_files:
@@ -359,77 +416,20 @@ class ElectionAnalyzerApp:
 
         self._ensure_data_loaded() # [최적화] 데이터 로드 보장
 
-        station_list = []  
-        seen = set()       
-        
-        # 캐시된 데이터에서 투표소 추출
-        for file in self.vote_files:
-            if file not in self.cached_data: continue
-            
-            df, _, _ = self.cached_data[file]
-            stations = df['사전투표소명'].unique()
-            
-            for s in stations:
-                s_str = str(s).strip()
-                if s_str and s_str != 'nan':
-                    if s_str not in seen:
-                        seen.add(s_str)
-                        station_list.append(s_str)
+        # [수정] 압축 저장소의 투표소 목록 사용 (파일 순서상 첫 등장 순)
+        station_list = list(self.snapshots.stations)
 
         # [수정] 사용자 지정 서식(C열:이름, F열:관내, G열:관외) 맞춤 로직
         equip_map = {}
         if self.equipment_file:
             try:
-                # 1. 파일 읽기 (헤더 없이 읽음)
-                if self.equipment_file.endswith('.csv'):
-                    try: df_raw = pd.read_csv(self.equipment_file, header=None, encoding='cp949')
-                    except: df_raw = pd.read_csv(self.equipment_file, header=None, encoding='utf-8')
-                else:
-                    df_raw = pd.read_excel(self.equipment_file, header=None)
-
-                # [추가] 3행(Index 2)에서 지역 이름 추출 로직
-                try:
-                    # 3행의 데이터 중 '값'이 있는 첫 번째 칸을 지역 이름으로 간주
-                    row_3_vals = df_raw.iloc[2].astype(str).values
-                    for v in row_3_vals:
-                        v_clean = v.strip().replace('nan', '')
-                        if v_clean:
-                            self.region_name = v_clean
-                            break
-                except:
-                    self.region_name = ""
-
-                # 2. 데이터 시작 행 찾기 (C열에 '읍면동'이나 '투표소'가 나오는 줄)
-                start_row_idx = 0
-                for idx, row in df_raw.head(15).iterrows():
-                    # 엑셀 C열은 인덱스 2
-                    c_col_val = str(row[2]).replace(" ", "")
-                    if "읍면동" in c_col_val or "투표소" in c_col_val:
-                        start_row_idx = idx + 1 # 헤더 다음 줄부터 데이터
-                        break
-                
-                # 3. 데이터 추출 (C열=2, F열=5, G열=6)
-                for idx in range(start_row_idx, len(df_raw)):
-                    row = df_raw.iloc[idx]
-                    
-                    # C열: 투표소명
-                    st_name = str(row[2]).strip()
-                    if st_name == 'nan' or not st_name: continue
-                    if '합계' in st_name or '소계' in st_name: continue
-
-                    # 숫자 정제 함수
-                    def parse_count(val):
-                        try:
-                            txt = str(val).split('(')[0].replace(',', '').replace('대', '').strip()
-                            return int(float(txt))
-                        except:
-                            return 1 
+                # 1. 파일 읽기 (헤더 없이 읽음, CSV 인코딩 자동 감지)
+                df_raw = read_sheet(self.equipment_file, header=None)
 
-                    # F열(5): 관내 장비수, G열(6): 관외 장비수
-                    intra_count = parse_count(row[5])
-                    extra_count = parse_count(row[6])
-
-                    equip_map[st_name] = {'intra': intra_count, 'extra': extra_count}
+                # 2. [최적화] 지역명(3행) + C/F/G열 추출을 열 단위 벡터 연산으로 처리
+                region_name, equip_map = parse_equipment_sheet(df_raw)
+                if region_name is not None:
+                    self.region_name = region_name
 
                 self.log(f"장비 파일 로드 완료: {len(equip_map)}개소 (C,F,G열 기준)")
 
@@ -445,52 +445,12 @@ class ElectionAnalyzerApp:
                 # 데이터 추출 내부 함수 (A열: 동명, B열: 숫자 라고 가정)
                 # [수정] 데이터 추출 내부 함수 (A열: 읍면동명, D열: 선거인수)
                 def load_elect_data(path):
-                    data_map = {}
+                    # [최적화] 열 단위 파싱 + 파일별 결과 캐시 (파일이 바뀌지 않았으면 재파싱 없음)
                     try:
-                        # 1. 헤더 없이 읽어서 데이터 위치 찾기
-                        if path.endswith('.csv'):
-                            try: df = pd.read_csv(path, header=None, encoding='cp949')
-                            except: df = pd.read_csv(path, header=None, encoding='utf-8')
-                        else:
-                            df = pd.read_excel(path, header=None)
-                        
-                        start_row = 0
-                        # 2. '읍면동명'이 있는 행 찾기 (헤더 위치 검색)
-                        for idx, row in df.head(15).iterrows():
-                            # A열(0번 인덱스) 확인
-                            if "읍면동명" in str(row[0]):
-                                start_row = idx + 1
-                                break
-                        
-                        # 3. 데이터 추출
-                        for idx in range(start_row, len(df)):
-                            row = df.iloc[idx]
-                            
-                            # A열(0): 동 이름
-                            k_raw = str(row[0])
-                            if pd.isna(row[0]) or k_raw.strip() == '' or k_raw == 'nan': continue
-                            
-                            k = k_raw.strip().replace(" ", "")
-                            if '합계' in k or '소계' in k: continue # 합계 행 제외
-                            
-                            # D열(3): 선거인수 (예: "21,412\n(25, 12)")
-                            v_raw = str(row[3])
-                            
-                            try:
-                                # 줄바꿈(\n)이나 괄호(() 앞부분의 숫자만 가져오기
-                                v_str = v_raw.split('\n')[0].split('(')[0]
-                                v_str = v_str.replace(',', '').strip()
-                                v = float(v_str)
-                                
-                                if v > 0:
-                                    data_map[k] = v
-                            except:
-                                continue
-                                
+                        return load_electorate_file(path)
                     except Exception as e:
                         print(f"선거인수 파일 읽기 실패({path}): {e}")
-                        
-                    return data_map
+                        return {}
 
                 past_map = load_elect_data(self.file_past_elect)
                 recent_map = load_elect_data(self.file_recent_elect)
@@ -521,18 +481,18 @@ class ElectionAnalyzerApp:
         
         sorted_stations = station_list
         self.station_data = {} 
+
+        # [최적화] 투표소 -> 장비/읍면동 매칭을 색인(해시 + Aho-Corasick)으로 한 번에 처리
+        # (부분 일치가 여러 개면 가장 긴 키, 같은 길이면 파일 순서상 앞의 키)
+        equip_match = get_matcher(equip_map).match_many(sorted_stations, reverse=True) if equip_map else {}
+        elect_match = get_matcher(electorate_rates).match_many(sorted_stations) if electorate_rates else {}
         current_global_rate = int(self.var_rate.get())
 
         for st in sorted_stations:
             # 1. 장비 매칭
             matched_data = None
-            if st in equip_map:
-                matched_data = equip_map[st]
-            else:
-                for k, v in equip_map.items():
-                    if str(k) in st or st in str(k): 
-                        matched_data = v
-                        break
+            if equip_match.get(st) is not None:
+                matched_data = equip_map[equip_match[st]]
             
             if matched_data:
                 intra = matched_data['intra']
@@ -545,22 +505,19 @@ class ElectionAnalyzerApp:
             elect_display = "-"
             elect_rate = 0 # 선거인수 변동률 기본값 0
             
-            if electorate_rates:
-                st_clean = st.replace(" ", "")
-                for dong_name, e_rate in electorate_rates.items():
-                    if dong_name in st_clean:
-                        elect_rate = e_rate
-                        
-                        diff = electorate_diffs.get(dong_name, 0)
-                        
-                        # [변경] 화살표 대신 직관적인 +, - 기호 사용
-                        if diff > 0:
-                            elect_display = f"+ {diff:,}" 
-                        elif diff < 0:
-                            elect_display = f"- {abs(diff):,}"
-                        else:
-                            elect_display = "-" # 변동 없음
-                        break
+            dong_name = elect_match.get(st)
+            if dong_name is not None:
+                elect_rate = electorate_rates[dong_name]
+                
+                diff = electorate_diffs.get(dong_name, 0)
+                
+                # [변경] 화살표 대신 직관적인 +, - 기호 사용
+                if diff > 0:
+                    elect_display = f"+ {diff:,}" 
+                elif diff < 0:
+                    elect_display = f"- {abs(diff):,}"
+                else:
+                    elect_display = "-" # 변동 없음
             
             # [수정] 데이터 저장: rate를 intra/extra로 분리
             self.station_data[st] = {
@@ -577,6 +534,7 @@ class ElectionAnalyzerApp:
             # 맨 뒤에 있었던 tags=(row_tag,) 부분을 지우세요.
             self.tree.insert("", "end", iid=st, values=(st, elect_display, intra, extra, rate_txt))
             
+        self._refresh_wait_column()
         self.log(f"목록 갱신 완료: 총 {len(sorted_stations)}개 투표소")
 
     def on_tree_double_click(self, event):
@@ -627,6 +585,7 @@ class ElectionAnalyzerApp:
                     disp_intra = get_display_text(new_intra, org_intra)
                     disp_extra = get_display_text(curr_extra, org_extra)
                     self.tree.item(item_id, values=(st_name, elect_disp, disp_intra, disp_extra, val_rate_intra, val_rate_extra))
+                    self._refresh_wait_column()
                     self.log(f"{st_name} 관내 장비 변경: {new_intra}대")
                     
             elif column == '#4': # 관외 장비
@@ -637,6 +596,7 @@ class ElectionAnalyzerApp:
                     disp_intra = get_display_text(curr_intra, org_intra)
                     disp_extra = get_display_text(new_extra, org_extra)
                     self.tree.item(item_id, values=(st_name, elect_disp, disp_intra, disp_extra, val_rate_intra, val_rate_extra))
+                    self._refresh_wait_column()
                     self.log(f"{st_name} 관외 장비 변경: {new_extra}대")
                     
             elif column == '#5': # 조정률(통합) 수정 -> 팝업 호출
@@ -651,30 +611,6 @@ class ElectionAnalyzerApp:
             import traceback
             traceback.print_exc()
 
-    def get_file_info_header(self, file_path):
-        try:
-            if file_path.endswith('.csv'):
-                try: df_meta = pd.read_csv(file_path, header=None, nrows=10, encoding='cp949')
-                except: df_meta = pd.read_csv(file_path, header=None, nrows=10, encoding='utf-8')
-            else:
-                df_meta = pd.read_excel(file_path, header=None, nrows=10)
-            
-            day, time = None, None
-            header_idx = 3
-
-            for idx, row in df_meta.iterrows():
-                row_str = " ".join(row.astype(str).values)
-                if day is None:
-                    match_day = re.search(r'\[(\d+)일차\]', row_str)
-                    match_time = re.search(r'\[(\d{1,2}):(\d{2})\]', row_str)
-                    if match_day: day = int(match_day.group(1))
-                    if match_time: time = int(match_time.group(1))
-                if "사전투표소명" in row_str or "읍면동명" in row_str:
-                    header_idx = idx
-            return day, time, header_idx
-        except:
-            return None, None, 3
-
     def run_simulation(self):
         if not self.vote_files:
             messagebox.showwarning("주의", "투표 데이터 파일이 없습니다.")
@@ -719,85 +655,46 @@ class ElectionAnalyzerApp:
             
             self._ensure_data_loaded() 
             
-            all_data = []
-            
-            # [기존 데이터 로드 및 계산 로직 유지]
-            for file in self.vote_files:
-                if file not in self.cached_data: continue
-                
-                try:
-                    org_df, day, time = self.cached_data[file]
-                    df = org_df.copy() 
-                    
-                    df['사전투표소명'] = df['사전투표소명'].astype(str).str.strip()
-                    
-                    user_rate_intra_map = {name: data.get('rate_intra', 0) for name, data in self.station_data.items()}
-                    user_rate_extra_map = {name: data.get('rate_extra', 0) for name, data in self.station_data.items()}
-                    
-                    user_rates_intra = df['사전투표소명'].map(user_rate_intra_map).fillna(0)
-                    user_rates_extra = df['사전투표소명'].map(user_rate_extra_map).fillna(0)
-                    
-                    elect_rate_map = {name: data.get('elect_rate', 0) for name, data in self.station_data.items()}
-                    elect_rates = df['사전투표소명'].map(elect_rate_map).fillna(0)
-                    
-                    factor_intra = (1 + (elect_rates / 100.0)) * (1 + (user_rates_intra / 100.0))
-                    factor_extra = (1 + (user_rates_extra / 100.0))
-                    
-                    df['관내사전투표자수'] = df['관내사전투표자수'] * factor_intra
-                    df['관외사전투표자수'] = df['관외사전투표자수'] * factor_extra
-                            
-                    df['일차'] = day
-                    df['시간대'] = time
-                    all_data.append(df)
-                except Exception as e:
-                    self.log(f"데이터 처리 오류({os.path.basename(file)}): {e}")
-
-            if not all_data:
+            # [수정] 압축 저장소에서 (투표소, 일차, 시간대) 순으로 정렬된 긴 형식 데이터 생성 (중복 칸은 먼저 나온 값)
+            store = self.snapshots
+            if store is None or not store.present.any():
                 self.root.after(0, lambda: messagebox.showerror("오류", "유효한 데이터가 없습니다."))
                 self.root.after(0, self.loading_win.destroy)
                 return
 
-            final_df = pd.concat(all_data, ignore_index=True)
-
-            original_order = []
-            seen = set()
-            for temp_df in all_data:
-                stats = temp_df['사전투표소명'].unique()
-                for s in stats:
-                    if s not in seen:
-                        seen.add(s)
-                        original_order.append(s)
-            
-            final_df['사전투표소명'] = pd.Categorical(
-                final_df['사전투표소명'], categories=original_order, ordered=True
-            )
-            
-            duplicates = final_df[final_df.duplicated(subset=['사전투표소명', '일차', '시간대'], keep=False)]
-            if not duplicates.empty:
-                final_df = final_df.drop_duplicates(subset=['사전투표소명', '일차', '시간대'])
-
-            final_df = final_df.sort_values(by=['사전투표소명', '일차', '시간대'])
-            
-            final_df['시간대별_관내투표자수'] = final_df.groupby(['사전투표소명', '일차'], observed=True)['관내사전투표자수'].diff()
-            final_df['시간대별_관외투표자수'] = final_df.groupby(['사전투표소명', '일차'], observed=True)['관외사전투표자수'].diff()
-            
-            for (st, day), group in final_df.groupby(['사전투표소명', '일차'], observed=True):
-                first_idx = group.index[0]
-                final_df.loc[first_idx, '시간대별_관내투표자수'] = final_df.loc[first_idx, '관내사전투표자수']
-                final_df.loc[first_idx, '시간대별_관외투표자수'] = final_df.loc[first_idx, '관외사전투표자수']
-
-            def get_equip_info(row, type_):
-                st = row['사전투표소명']
-                if st in self.station_data:
-                    return self.station_data[st][type_], self.station_data[st][f'org_{type_}']
-                return 1, 1
-
-            final_df[['관내장비수', '원본_관내장비수']] = final_df.apply(lambda x: pd.Series(get_equip_info(x, 'intra')), axis=1)
-            final_df[['관외장비수', '원본_관외장비수']] = final_df.apply(lambda x: pd.Series(get_equip_info(x, 'extra')), axis=1)
+            factor_intra, factor_extra = store.factors(self.station_data)
+            # [최적화] 시간대별 순증가분(각 일차 첫 시간대는 누적값)을 배열 연산 한 번으로 계산
+            # 정렬/칸 위치 등 파일에만 의존하는 기본 단계는 저장소에 캐시되므로,
+            # 조정률·장비 수만 바꾼 재분석은 아래 투영 단계(계수 곱, 장비 수 나눗셈)만 다시 수행
+            final_df = store.to_frame(factor_intra, factor_extra, deltas=True)
+
+            # [최적화] 투표소별 장비 수 배열을 만들어 투표소 코드로 인덱싱 (행마다 apply 하지 않음)
+            st_codes = final_df['사전투표소명'].cat.codes.to_numpy()
+            for type_, col, org_col in [('intra', '관내장비수', '원본_관내장비수'), ('extra', '관외장비수', '원본_관외장비수')]:
+                cur = [self.station_data[st][type_] if st in self.station_data else 1 for st in store.stations]
+                org = [self.station_data[st][f'org_{type_}'] if st in self.station_data else 1 for st in store.stations]
+                # (현재, 원본) 두 값을 함께 형변환: 한쪽이라도 실수면 두 컬럼 모두 실수 (기존 apply 결과와 동일)
+                pair = np.array([cur, org])[:, st_codes]
+                final_df[col] = pair[0]
+                final_df[org_col] = pair[1]
 
             final_df['관내_혼잡도'] = final_df['시간대별_관내투표자수'] / final_df['관내장비수']
             final_df['관외_혼잡도'] = final_df['시간대별_관외투표자수'] / final_df['관외장비수']
 
+            # [추가] 투표율/시간대 분포 불확실성: 몬테카를로 시행들의 P50/P90/P99 혼잡도 (행 순서 = 저장소 칸 순서)
+            try:
+                bands = self._monte_carlo_bands(factor_intra, factor_extra)
+                s_idx, d_idx, h_idx = np.nonzero(store.present)
+                for type_name, key, eq_col in [('관내', 'intra', '관내장비수'), ('관외', 'extra', '관외장비수')]:
+                    for qi, q in enumerate(bands['quantiles']):
+                        final_df[f'{type_name}_혼잡도_P{round(q * 100)}'] = bands[key][qi, s_idx, d_idx, h_idx] / final_df[eq_col].to_numpy()
+                self.log(f"불확실성 시뮬레이션 완료 ({self.mc_draws}회, 시드 {self.mc_seed})")
+            except Exception as e:
+                # [수정] 분위수 열 없이 리포트는 계속 만들되, 원인을 로그창과 콘솔(traceback)에 남김
+                self.log(f"불확실성 시뮬레이션 실패 ({type(e).__name__}): {e} - 분위수(P50/P90/P99) 열 없이 저장합니다.")
+                import traceback
+                traceback.print_exc()
+
             final_df = final_df.loc[:, ~final_df.columns.str.contains('^Unnamed')]
             
             # [짧은 이름 생성] 시각화 및 엑셀 저장 시 사용
@@ -1045,6 +942,14 @@ class ElectionAnalyzerApp:
                 ws.column_dimensions['C'].width = 12 # 전체평균
                 for col in range(4, max_col + 1):
                     ws.column_dimensions[get_column_letter(col)].width = 6 # 시간대
+
+            # [추가] 몬테카를로 혼잡도 분위수 시트 (투표소 x 일차 x 시간대, 장비 1대당 투표자 수)
+            band_cols = [c for c in df.columns if '_혼잡도_P' in str(c)]
+            if band_cols:
+                df_band = df[df['일차'] != '전체'][['short_name', '일차', '시간대'] + band_cols]
+                df_band = df_band.rename(columns={'short_name': '투표소'}).round(1)
+                df_band.to_excel(writer, sheet_name='혼잡도_분위수', index=False)
+                writer.sheets['혼잡도_분위수'].column_dimensions['A'].width = 15
     
     def _read_equip_summary(self):
         """
@@ -1058,11 +963,7 @@ class ElectionAnalyzerApp:
             
         try:
             # 헤더 없이 읽어서 절대 좌표(행/열)로 접근
-            if self.equipment_file.endswith('.csv'):
-                try: df = pd.read_csv(self.equipment_file, header=None, encoding='cp949')
-                except: df = pd.read_csv(self.equipment_file, header=None, encoding='utf-8')
-            else:
-                df = pd.read_excel(self.equipment_file, header=None)
+            df = read_sheet(self.equipment_file, header=None)
             
             # 파일 크기가 D7, H7을 읽을 수 있는지 확인 (행 7개 이상, 열 8개 이상)
             if df.shape[0] < 7 or df.shape[1] < 8:
@@ -1088,6 +989,181 @@ class ElectionAnalyzerApp:
             print(f"장비 요약 정보 로드 실패: {e}")
             return None, None
         
+    def _erlang_waits(self):
+        # [추가] 해석식(Erlang-C) 시간대별 평균 대기시간 [분] -> (관내[투표소, 일차, 시간대], 관외[...])
+        # 도착률 = 순증가분 / 구간 길이(시간), 1인당 처리 시간 = 대기시간 팝업의 발급 시간, 창구 수 = 현재 장비 수
+        store = self.snapshots
+        factor_intra, factor_extra = store.factors(self.station_data)
+        delta_intra, delta_extra = store.hourly_deltas(*store.scaled(factor_intra, factor_extra))
+        slot = store.slot_hours()
+        waits = []
+        for key, delta in (('intra', delta_intra), ('extra', delta_extra)):
+            servers = np.array([self.station_data.get(st, {}).get(key, 0) for st in store.stations])
+            _, wait = erlang_c(delta / slot, self.service_sec[key], servers[:, None, None])
+            waits.append(wait)
+        return waits
+
+    def _refresh_wait_column(self):
+        # [추가] 장비 수/조정률/발급 시간이 바뀔 때마다 표의 '예상대기' 열 즉시 갱신 (투표소별 가장 긴 시간대 평균 대기)
+        store = self.snapshots
+        if store is None or not store.stations or not self.station_data:
+            return
+        worst = [np.fmax.reduce(w.reshape(len(store.stations), -1), axis=1, initial=np.nan) for w in self._erlang_waits()]
+
+        def _fmt(w):
+            return "-" if np.isnan(w) else ("초과" if np.isinf(w) else f"{w:.1f}")
+        for code, st in enumerate(store.stations):
+            if self.tree.exists(st):
+                self.tree.set(st, "wait", f"{_fmt(worst[0][code])} / {_fmt(worst[1][code])}")
+
+    def open_wait_popup(self):
+        # [추가] 대기시간 시뮬레이션 설정 팝업 (1인당 발급/기표 시간)
+        if not self.vote_files:
+            messagebox.showwarning("주의", "먼저 투표 데이터 파일을 로드해주세요.")
+            return
+
+        pop = tk.Toplevel(self.root)
+        pop.title("대기시간 시뮬레이션")
+        pop.geometry("350x330")
+        pop.resizable(False, False)
+
+        x = self.root.winfo_x() + (self.root.winfo_width() // 2) - 175
+        y = self.root.winfo_y() + (self.root.winfo_height() // 2) - 165
+        pop.geometry(f"+{x}+{y}")
+
+        ttk.Label(pop, text="현재 장비 수로 시간대별 대기열을 시뮬레이션합니다.\n기표 시간을 비우거나 0이면 발급 대기만 계산합니다.",
+                  justify="center", foreground="gray").pack(pady=(15, 5))
+
+        def create_input(parent, label, default_val):
+            f = ttk.Frame(parent)
+            f.pack(fill="x", pady=5)
+            ttk.Label(f, text=label, width=14, font=("맑은 고딕", 9)).pack(side="left")
+            entry = ttk.Entry(f, justify="right", width=10)
+            entry.insert(0, str(default_val) if default_val else "")
+            entry.pack(side="right")
+            return entry
+
+        frame_issue = ttk.LabelFrame(pop, text=" [발급] 1인당 처리 시간 (초) ", padding="10")
+        frame_issue.pack(fill="x", padx=15, pady=5)
+        entry_issue_i = create_input(frame_issue, "① 관내 시간:", self.service_sec['intra'])
+        entry_issue_e = create_input(frame_issue, "② 관외 시간:", self.service_sec['extra'])
+
+        frame_booth = ttk.LabelFrame(pop, text=" [기표대] 1인당 기표 시간 (초, 선택) ", padding="10")
+        frame_booth.pack(fill="x", padx=15, pady=5)
+        entry_booth_i = create_input(frame_booth, "① 관내 시간:", self.booth_sec['intra'])
+        entry_booth_e = create_input(frame_booth, "② 관외 시간:", self.booth_sec['extra'])
+
+        def _run():
+            def _get_val(entry):
+                text = entry.get().strip()
+                return float(text) if text else 0.0
+            try:
+                service = {'intra': _get_val(entry_issue_i), 'extra': _get_val(entry_issue_e)}
+                booth = {'intra': _get_val(entry_booth_i), 'extra': _get_val(entry_booth_e)}
+            except ValueError:
+                messagebox.showerror("오류", "유효한 숫자를 입력해주세요.", parent=pop)
+                return
+            if service['intra'] <= 0 or service['extra'] <= 0 or booth['intra'] < 0 or booth['extra'] < 0:
+                messagebox.showerror("오류", "발급 시간은 0보다 커야 합니다.", parent=pop)
+                return
+            self.service_sec = service
+            self.booth_sec = booth
+            self._refresh_wait_column()
+            pop.destroy()
+            self.run_wait_simulation()
+
+        ttk.Button(pop, text="⏱ 시뮬레이션 실행 및 엑셀 저장", command=_run).pack(fill="x", padx=15, pady=15, ipady=4)
+
+    def run_wait_simulation(self):
+        # [추가] 대기시간 시뮬레이션은 별도 스레드에서 실행 (투표소별 프로세스 풀 병렬)
+        self.loading_win = tk.Toplevel(self.root)
+        self.loading_win.title("처리 중")
+        self.loading_win.geometry("300x100")
+        self.loading_win.resizable(False, False)
+        self.loading_win.grab_set()
+
+        x = self.root.winfo_x() + (self.root.winfo_width() // 2) - 150
+        y = self.root.winfo_y() + (self.root.winfo_height() // 2) - 50
+        self.loading_win.geometry(f"+{x}+{y}")
+
+        ttk.Label(self.loading_win, text="대기시간 시뮬레이션 중입니다...\n잠시만 기다려 주세요.", justify="center").pack(pady=20)
+        pb = ttk.Progressbar(self.loading_win, mode='indeterminate')
+        pb.pack(fill="x", padx=20, pady=(0, 20))
+        pb.start(10)
+
+        threading.Thread(target=self._execute_wait_simulation, daemon=True).start()
+
+    def _execute_wait_simulation(self):
+        try:
+            self._ensure_data_loaded()
+            store = self.snapshots
+            factor_intra, factor_extra = store.factors(self.station_data)
+            delta_intra, delta_extra = store.hourly_deltas(*store.scaled(factor_intra, factor_extra))
+            # 기표대 수는 소요량 산출과 같은 기준 (시간대별 투표자 상위 3개 평균 x 기표 시간)
+            profile = store.load_profile(factor_intra, factor_extra, top_k=3)
+
+            jobs = []
+            for code, st in enumerate(store.stations):
+                if st not in self.station_data or not profile['has_data'][code]: continue
+                d = self.station_data[st]
+                booths = {key: required_booths(profile['peak_' + key][code], self.booth_sec[key]) if self.booth_sec[key] > 0 else 0
+                          for key in ('intra', 'extra')}
+                jobs.append({
+                    'code': code,
+                    'counts': {'intra': delta_intra[code], 'extra': delta_extra[code]},
+                    'hours': store.hours, 'present': store.present[code],
+                    'servers': {'intra': d['intra'], 'extra': d['extra']},
+                    'service_sec': dict(self.service_sec),
+                    'booths': booths, 'booth_sec': dict(self.booth_sec),
+                    'seed': self.mc_seed + code,
+                })
+            if not jobs:
+                raise ValueError("시뮬레이션할 투표소가 없습니다. 투표소 스캔/이름 매칭을 확인해주세요.")
+
+            self.log(f"대기시간 시뮬레이션 시작: 투표소 {len(jobs)}곳")
+            results = simulate_waits(jobs, workers=self.load_workers, log=self.log)
+
+            rows = []
+            for job in jobs:
+                code = job['code']
+                res = results[code]
+                for d_i, h_i in zip(*np.nonzero(job['present'])):
+                    rows.append({
+                        '사전투표소명': store.stations[code],
+                        '일차': int(store.days[d_i]),
+                        '시간대': int(store.hours[h_i]),
+                        '관내 도착(명)': round(float(delta_intra[code, d_i, h_i]), 1),
+                        '관내 장비': job['servers']['intra'],
+                        '관내 평균대기(분)': round(float(res['intra'][0][d_i, h_i]), 1),
+                        '관내 95%대기(분)': round(float(res['intra'][1][d_i, h_i]), 1),
+                        '관외 도착(명)': round(float(delta_extra[code, d_i, h_i]), 1),
+                        '관외 장비': job['servers']['extra'],
+                        '관외 평균대기(분)': round(float(res['extra'][0][d_i, h_i]), 1),
+                        '관외 95%대기(분)': round(float(res['extra'][1][d_i, h_i]), 1),
+                    })
+
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M')
+            if getattr(sys, 'frozen', False):
+                script_dir = os.path.dirname(os.path.abspath(sys.executable))
+            else:
+                script_dir = os.path.dirname(os.path.abspath(__file__))
+            save_path = os.path.join(script_dir, f"대기시간_시뮬레이션_{timestamp}.xlsx")
+            # 장비 0대 창구의 무한 대기는 표의 예상대기 열과 같이 '초과'로 표시
+            pd.DataFrame(rows).to_excel(save_path, index=False, inf_rep="초과")
+            self.log(f"대기시간 시뮬레이션 저장 완료: {save_path}")
+
+            def _finish():
+                self.loading_win.destroy()
+                messagebox.showinfo("완료", f"대기시간 시뮬레이션 완료!\n\n파일이 저장되었습니다:\n{save_path}")
+            self.root.after(0, _finish)
+
+        except Exception as e:
+            err_msg = str(e)
+            def _fail():
+                self.loading_win.destroy()
+                messagebox.showerror("오류", f"대기시간 시뮬레이션 중 오류 발생:\n{err_msg}")
+            self.root.after(0, _fail)
+
     def open_balance_popup(self):
         if not self.vote_files:
             messagebox.showwarning("주의", "먼저 투표 데이터 파일을 로드해주세요.")
@@ -1112,7 +1188,7 @@ class ElectionAnalyzerApp:
         # 팝업창 생성
         pop = tk.Toplevel(self.root)
         pop.title("장비 자동 배분 (통합 모드)")
-        pop.geometry("350x260") # [변경] 메시지 삭제로 높이를 300 -> 260으로 줄임
+        pop.geometry("350x540") # [변경] 배분 기준을 세로 배치(P90 추가)하여 높이를 480 -> 540으로 늘림
         pop.resizable(False, False)
         
         # 화면 중앙 배치
@@ -1139,125 +1215,284 @@ class ElectionAnalyzerApp:
             
         entry_total = create_entry(frame_input, "총 보유 장비:", default_total_assets)
         entry_reserve = create_entry(frame_input, "예비 장비:", default_reserve)
+        # [추가] 관외 가중치 (관외 1인당 처리시간 / 관내 1인당 처리시간)
+        entry_weight = create_entry(frame_input, "관외 가중치:", self.weight_extra)
+
+        def _estimate_weight():
+            # [수정] 포화(혼잡) 시간대만으로 추정하고, 결과를 보여준 뒤 적용 여부를 확인 (입력칸을 조용히 덮어쓰지 않음)
+            est = self.estimate_weight_extra()
+            if est is None:
+                messagebox.showwarning("추정 불가", "관외 가중치를 추정할 혼잡(포화) 시간대 데이터가 부족합니다.\n"
+                                       "(비혼잡 시간대 처리량은 수요를 나타내므로 추정에 쓰지 않습니다)", parent=pop)
+                return
+            msg = (f"추정 관외 가중치: {est['weight']:.3f}\n"
+                   f"(포화 시간대 관내 {est['cells_intra']}칸 / 관외 {est['cells_extra']}칸 기준)")
+            if est['clamped']:
+                msg += f"\n\n※ 원래 추정값 {est['raw']:.3f} 이 허용 범위를 벗어나 경계값으로 잘랐습니다."
+            self.log(f"[관외 가중치] 포화 시간대 처리량 기준 추정값: {est['raw']:.3f}" + (" (범위 제한)" if est['clamped'] else ""))
+            if not messagebox.askyesno("관외 가중치 추정", msg + "\n\n이 값을 적용하시겠습니까?", parent=pop):
+                return
+            entry_weight.delete(0, tk.END)
+            entry_weight.insert(0, f"{est['weight']:.3f}")
+
+        ttk.Button(frame_input, text="데이터로 관외 가중치 추정", command=_estimate_weight).pack(fill="x", pady=(4, 0))
+
+        # [추가] 정확 최적화: 창구별 최대 50대, 분소 관외 최소 대수, 읍면동 간 장비 이동 불가 조건 적용
+        var_exact = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame_input, text="정확 최적화 (제약 조건 적용)", variable=var_exact).pack(anchor="w", pady=(6, 0))
+
+        # [추가] 배분 기준: 11~18시 합계 부하 / 가장 붐비는 시간대 부하
+        var_strategy = tk.StringVar(value=self.balance_strategy)
+        frame_strategy = ttk.Frame(frame_input)
+        frame_strategy.pack(fill="x", pady=(4, 0))
+        ttk.Label(frame_strategy, text="배분 기준:").pack(anchor="w")
+        ttk.Radiobutton(frame_strategy, text="11~18시 합계", value='window', variable=var_strategy).pack(anchor="w", padx=(12, 0))
+        ttk.Radiobutton(frame_strategy, text="최대 시간대", value='peak', variable=var_strategy).pack(anchor="w", padx=(12, 0))
+        ttk.Radiobutton(frame_strategy, text="최대 시간대 P90 (불확실성 반영)", value='peak_p90', variable=var_strategy).pack(anchor="w", padx=(12, 0))
         
-        def _run():
+        # [수정] 입력값 검증을 배분 실행/예산 곡선 저장에서 함께 사용
+        def _read_inputs():
             try:
                 total_assets = int(entry_total.get())
                 total_reserve = int(entry_reserve.get())
-                
-                self.last_reserve_count = total_reserve
-                
-                available = total_assets - total_reserve
-                min_req = len(self.station_data) * 2
-                
-                if available < min_req:
-                    msg = f"장비가 부족합니다!\n\n투표소 수: {len(self.station_data)}개\n최소 필요 장비: {min_req}대 (관내1+관외1)\n현재 가용 장비: {available}대"
-                    messagebox.showerror("배분 불가", msg)
-                    return
-                    
-                self.run_auto_balance(total_assets, total_reserve)
-                pop.destroy()
-                
+                weight_extra = float(entry_weight.get())
             except ValueError:
                 messagebox.showerror("오류", "유효한 숫자를 입력해주세요.")
+                return None
+            if weight_extra <= 0:
+                messagebox.showerror("오류", "관외 가중치는 0보다 커야 합니다.")
+                return None
+            self.weight_extra = weight_extra
+            self.balance_strategy = var_strategy.get()
+                
+            self.last_reserve_count = total_reserve
+            
+            available = total_assets - total_reserve
+            min_req = len(self.station_data) * 2
+            
+            if available < min_req:
+                msg = f"장비가 부족합니다!\n\n투표소 수: {len(self.station_data)}개\n최소 필요 장비: {min_req}대 (관내1+관외1)\n현재 가용 장비: {available}대"
+                messagebox.showerror("배분 불가", msg)
+                return None
+            return total_assets, total_reserve
+
+        def _run():
+            inputs = _read_inputs()
+            if inputs is None: return
+            self.run_auto_balance(*inputs, exact=var_exact.get(), strategy=self.balance_strategy)
+            pop.destroy()
+
+        def _run_sweep():
+            inputs = _read_inputs()
+            if inputs is None: return
+            self.save_budget_sweep(*inputs, strategy=self.balance_strategy)
+
+        ttk.Button(pop, text="최적 배분 실행", command=_run).pack(fill="x", padx=20, pady=(20, 5))
+        # [추가] 최소 장비 ~ 가용 장비까지 예산별 최대/평균 부하 곡선 저장
+        ttk.Button(pop, text="📈 예산별 혼잡도 곡선 저장", command=_run_sweep).pack(fill="x", padx=20, pady=(5, 20))
+
+    def save_budget_sweep(self, total_assets, total_reserve, strategy='window'):
+        # [추가] 장비 예산별 자동 배분 결과(최대/평균 부하)를 한 번에 계산해 엑셀 + 그래프로 저장
+        # 그리디 배분은 N대 결과에 1대를 더한 것이 N+1대 결과이므로 한 번의 패스로 모든 예산을 구함
+        try:
+            station_stats = self._collect_balance_stats(strategy)
+            base_alloc = {st: {'intra': 1, 'extra': 1} for st in self.station_data}
+            rows = budget_sweep(base_alloc, station_stats, total_assets - total_reserve, self.weight_extra)
+            if not rows:
+                messagebox.showwarning("주의", "투표소 정보가 없습니다. 먼저 투표소 스캔을 진행해주세요.")
+                return
+
+            type_label = {'intra': '관내', 'extra': '관외'}
+            df_sweep = pd.DataFrame([
+                {
+                    '총 장비 수': total,
+                    '최대 부하(명/대)': round(max_load, 1),
+                    '평균 부하(명/대)': round(mean_load, 1),
+                    '최대 부하 투표소': st,
+                    '구분': type_label[r_type],
+                }
+                for total, max_load, mean_load, st, r_type in rows
+            ])
+
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M')
+            if getattr(sys, 'frozen', False):
+                script_dir = os.path.dirname(os.path.abspath(sys.executable))
+            else:
+                script_dir = os.path.dirname(os.path.abspath(__file__))
 
-        ttk.Button(pop, text="최적 배분 실행", command=_run).pack(fill="x", padx=20, pady=20)
+            excel_path = os.path.join(script_dir, f"장비예산_곡선_{timestamp}.xlsx")
+            df_sweep.to_excel(excel_path, index=False)
+
+            png_path = os.path.join(script_dir, f"장비예산_곡선_{timestamp}.png")
+            fig, ax = plt.subplots(figsize=(10, 6))
+            ax.plot(df_sweep['총 장비 수'], df_sweep['최대 부하(명/대)'], marker='.', label='최대 부하')
+            ax.plot(df_sweep['총 장비 수'], df_sweep['평균 부하(명/대)'], marker='.', label='평균 부하')
+            ax.axvline(total_assets - total_reserve, color='gray', linestyle='--', label='현재 가용 장비')
+            ax.set_xlabel('총 장비 수 (예비 제외)')
+            ax.set_ylabel('장비 1대당 투표자 수 (최대 시간대)' if strategy != 'window' else '장비 1대당 투표자 수 (11~18시)')
+            ax.set_title('장비 예산별 혼잡도 곡선', fontsize=14, fontweight='bold')
+            ax.grid(True, alpha=0.3)
+            ax.legend()
+            fig.tight_layout()
+            fig.savefig(png_path)
+            plt.close(fig)
 
-    def run_auto_balance(self, total_assets, total_reserve):
+            self.log(f"예산별 혼잡도 곡선 저장 완료: {excel_path}")
+            messagebox.showinfo("완료", f"예산별 혼잡도 곡선을 저장했습니다.\n\n{excel_path}\n{png_path}")
+        except Exception as e:
+            messagebox.showerror("오류", f"예산별 곡선 계산 중 오류 발생:\n{e}")
+
+    def estimate_weight_extra(self):
+        # [추가] 불러온 투표 데이터의 시간대별 처리량(장비 1대당)으로 관외 가중치 추정
+        # -> estimate_extra_weight 결과 dict (weight/raw/clamped/사용 칸 수), 추정 불가 시 None
         self._ensure_data_loaded()
-        
-        # 1. 사용할 수 있는 실제 장비 수
-        target_count = total_assets - total_reserve
-        num_stations = len(self.station_data)
-        
-        # ---------------------------------------------------------
-        # [수정] 2. 기초 데이터 집계 (시각화 로직과 동일한 알고리즘 적용)
-        # ---------------------------------------------------------
+        store = self.snapshots
+        if not store.stations:
+            return None
+        ones = np.ones(len(store.stations))
+        profile = store.load_profile(ones, ones)
+        # 당시 장비 수 = 장비 현황 파일의 원래 장비 수 (스캔되지 않은 투표소는 제외)
+        n_intra = [self.station_data.get(st, {}).get('org_intra', 0) for st in store.stations]
+        n_extra = [self.station_data.get(st, {}).get('org_extra', 0) for st in store.stations]
+        return estimate_extra_weight(profile['delta_intra'], profile['delta_extra'], n_intra, n_extra)
+
+    def _monte_carlo_bands(self, factor_intra, factor_extra, cancel=None, progress=None):
+        # [추가] 시간대별 순증가분에 투표율/시간대 분포 변동을 준 몬테카를로 분위수 (vote_sim 참고)
+        # [최적화] 결과는 증감 계수/시드/시행 수에만 의존 (장비 수 무관) -> 같으면 이전 결과 재사용
+        store = self.snapshots
+        key = (factor_intra.tobytes(), factor_extra.tobytes(), self.mc_seed, self.mc_draws)
+        if self._mc_cache is not None and self._mc_cache[0] is store and self._mc_cache[1] == key:
+            return self._mc_cache[2]
+        delta_intra, delta_extra = store.hourly_deltas(*store.scaled(factor_intra, factor_extra))
+        bands = monte_carlo_bands(delta_intra, delta_extra, n_draws=self.mc_draws, seed=self.mc_seed,
+                                  cancel=cancel, progress=progress)
+        if bands is None:
+            return None  # 취소됨 (캐시하지 않음)
+        self._mc_cache = (store, key, bands)
+        return bands
+
+    def _collect_balance_stats(self, strategy='window', cancel=None, progress=None):
+        # [추가] 자동 배분/예산 곡선 공용: 투표소별 11~18시 관내/관외 투표자 수 집계
+        # [최적화] 행 단위 루프 대신 압축 저장소에서 투표소 전체를 한 번에 계산
+        # (by_day=False: 같은 시간대는 뒤 일차 값으로 덮어쓴 뒤 시간대 순으로 순증가분 계산
+        #  [변경] 예전 루프는 파일 선택 순서상 나중 파일이 이겼으나, 이제는 선택 순서와 무관하게 뒤 일차 값 사용)
+        # [추가] strategy='peak': 합계 대신 가장 붐비는 한 시간(일차별 시간대 순증가분 최댓값)을 기준으로 집계
+        #        장비 수는 시간대와 무관하므로 max(시간대별 투표자 / 장비) = 최대 시간대 투표자 / 장비
+        #        -> 같은 배분 알고리즘으로 '시간대 최대 부하'를 최소화
+        self._ensure_data_loaded()
+
+        store = self.snapshots
+        factor_intra, factor_extra = store.factors(self.station_data)
+        if strategy in ('peak', 'peak_p90'):
+            profile = store.load_profile(factor_intra, factor_extra, top_k=1)
+            key_intra, key_extra = 'peak_intra', 'peak_extra'
+            if strategy == 'peak_p90':
+                # [추가] 몬테카를로 시행별 최대 시간대 투표자 수의 P90 (10번 중 9번은 이 이하)
+                # 몬테카를로는 투표소 묶음마다 progress(0~1) 보고 / cancel 확인 (취소 시 None 반환)
+                bands = self._monte_carlo_bands(factor_intra, factor_extra, cancel, progress)
+                if bands is None:
+                    return None
+                qi = list(bands['quantiles']).index(0.9)
+                profile = dict(profile, peak_intra=bands['peak_intra'][qi], peak_extra=bands['peak_extra'][qi])
+        else:
+            profile = store.load_profile(factor_intra, factor_extra, window=(11, 18), by_day=False)
+            key_intra, key_extra = 'window_intra', 'window_extra'
+
         station_stats = {}
+        for code, st_name in enumerate(store.stations):
+            if st_name not in self.station_data or not profile['has_data'][code]: continue
+            station_stats[st_name] = {
+                'intra_voters': float(profile[key_intra][code]),
+                'extra_voters': float(profile[key_extra][code])
+            }
+        return station_stats
 
-        # (1) 데이터를 시간 순서대로 정렬하기 위해 구조화
-        # 구조: temp_data[투표소명][시간] = {'intra':값, 'extra':값}
-        temp_data = {}
-        all_times = set()
+    def run_auto_balance(self, total_assets, total_reserve, exact=False, strategy='window'):
+        # [수정] 집계/배분 계산은 별도 스레드에서 실행 (진행률 표시 + 취소 가능), 결과는 root.after 로 화면에 반영
+        cancel = threading.Event()
 
-        for file in self.vote_files:
-            if file not in self.cached_data: continue
-            df, day, time = self.cached_data[file]
-            
-            # 시간이 없는 데이터는 제외
-            if time is None: continue
-            
-            all_times.add(time)
+        win = tk.Toplevel(self.root)
+        win.title("자동 배분 중")
+        win.geometry("300x140")
+        win.resizable(False, False)
+        win.grab_set()
 
-            for idx, row in df.iterrows():
-                st_name = str(row['사전투표소명']).strip()
-                if st_name not in self.station_data: continue 
-                
-                if st_name not in temp_data:
-                    temp_data[st_name] = {}
-                
-                # 예측 비율(가중치) 적용
-                user_rate_intra = self.station_data[st_name]['rate_intra']
-                user_rate_extra = self.station_data[st_name]['rate_extra']
-                elect_rate = self.station_data[st_name].get('elect_rate', 0)
-                
-                factor_intra = (1 + (elect_rate / 100.0)) * (1 + (user_rate_intra / 100.0))
-                factor_extra = (1 + (user_rate_extra / 100.0))
-                
-                try:
-                    v_intra = float(row['관내사전투표자수']) * factor_intra
-                    v_extra = float(row['관외사전투표자수']) * factor_extra
-                    
-                    temp_data[st_name][time] = {
-                        'intra': v_intra,
-                        'extra': v_extra
-                    }
-                except: pass
-        
-        # (2) 시간순으로 순회하며 '구간별 순증가분(Delta)' 계산 및 11~18시 필터링
-        sorted_times = sorted(list(all_times)) # 시간을 오름차순 정렬 (예: 7, 8, ..., 18)
+        x = self.root.winfo_x() + (self.root.winfo_width() // 2) - 150
+        y = self.root.winfo_y() + (self.root.winfo_height() // 2) - 70
+        win.geometry(f"+{x}+{y}")
+
+        lbl = ttk.Label(win, text="자동 배분 준비 중...", justify="center")
+        lbl.pack(pady=(15, 10))
+
+        # 진행률 표시 (0~100)
+        pb = ttk.Progressbar(win, mode='determinate', maximum=100)
+        pb.pack(fill="x", padx=20)
+
+        def _cancel():
+            cancel.set()
+            btn_cancel.config(state="disabled")
+            lbl.config(text="취소 중...")
+
+        btn_cancel = ttk.Button(win, text="취소", command=_cancel)
+        btn_cancel.pack(pady=10)
+        win.protocol("WM_DELETE_WINDOW", _cancel)
+
+        last = [-1]
+        def set_progress(value, text=None):
+            # 작업 스레드에서 호출 -> 값이 바뀐 경우에만 메인 스레드로 전달
+            value = int(value)
+            if value == last[0] and text is None:
+                return
+            last[0] = value
+            def _update():
+                if not win.winfo_exists(): return
+                pb.config(value=value)
+                if text is not None and not cancel.is_set():
+                    lbl.config(text=text)
+            self.root.after(0, _update)
+
+        def _worker():
+            try:
+                result = self._compute_auto_balance(total_assets, total_reserve, set_progress, cancel, exact, strategy)
+            except Exception as e:
+                err_msg = str(e)
+                def _fail():
+                    win.destroy()
+                    messagebox.showerror("오류", f"자동 배분 중 오류 발생:\n{err_msg}")
+                self.root.after(0, _fail)
+                return
+
+            def _finish():
+                win.destroy()
+                if result is None or cancel.is_set():
+                    self.log("[자동 배분] 사용자가 취소했습니다.")
+                    return
+                current_alloc, info = result
+                self._apply_auto_balance(current_alloc, total_assets, total_reserve, info)
+            self.root.after(0, _finish)
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    def _compute_auto_balance(self, total_assets, total_reserve, set_progress, cancel, exact=False, strategy='window'):
+        # [추가] 작업 스레드에서 실행: (배분 결과 current_alloc, 정확 최적화 정보 또는 None) 반환, 취소되면 None
+        # 1. 사용할 수 있는 실제 장비 수
+        target_count = total_assets - total_reserve
+        num_stations = len(self.station_data)
         
-        for st_name, time_map in temp_data.items():
-            # 집계용 변수 초기화
-            total_intra_in_target_time = 0
-            total_extra_in_target_time = 0
-            
-            # 이전 시간대 누적값 (초기값 0)
-            prev_intra = 0
-            prev_extra = 0
-            
-            for t in sorted_times:
-                # 해당 시간대 데이터가 없으면 건너뜀 (단, prev는 유지해야 함 - 누적데이터이므로)
-                # 만약 중간 데이터가 빠져도, 다음 데이터에서 (현재 - 과거)를 하면 그 사이 증가분이 한꺼번에 반영됨
-                if t not in time_map:
-                    continue
-                
-                curr_intra = time_map[t]['intra']
-                curr_extra = time_map[t]['extra']
-                
-                # [핵심] 현재 누적값 - 이전 누적값 = 해당 시간대 순수 투표자 수
-                delta_intra = curr_intra - prev_intra
-                delta_extra = curr_extra - prev_extra
-                
-                # 음수 보정 (데이터 오류 등)
-                if delta_intra < 0: delta_intra = 0
-                if delta_extra < 0: delta_extra = 0
-                
-                # [필터링] 우리가 원하는 11시 ~ 18시 사이의 데이터만 합산
-                if 11 <= t <= 18:
-                    total_intra_in_target_time += delta_intra
-                    total_extra_in_target_time += delta_extra
-                
-                # 다음 루프를 위해 현재 값을 '이전 값'으로 갱신
-                prev_intra = curr_intra
-                prev_extra = curr_extra
-            
-            # 최종 계산된 값을 station_stats에 저장
-            station_stats[st_name] = {
-                'intra_voters': total_intra_in_target_time,
-                'extra_voters': total_extra_in_target_time
-            }
-        # ---------------------------------------------------------
+        # 2. 기초 데이터 집계 (투표소별 11~18시 관내/관외 투표자 수)
+        # [수정] 오래 걸리는 단계(파일 로드 / 집계·몬테카를로 / 배분) 사이마다 취소 여부 확인
+        set_progress(0, "투표 데이터 확인 중...")
+        self._ensure_data_loaded()
+        if cancel.is_set():
+            return None
+        if strategy == 'peak_p90':
+            set_progress(20, f"불확실성 시뮬레이션 중... ({self.mc_draws}회)")
+        else:
+            set_progress(20, "투표소별 투표자 수 집계 중...")
+        station_stats = self._collect_balance_stats(strategy, cancel, lambda f: set_progress(20 + 40 * f))
+        if station_stats is None or cancel.is_set():
+            return None
+        set_progress(60, "정확 최적화 계산 중..." if exact else "장비 배분 계산 중...")
         
         # 3. 배분 알고리즘 시작
         # (1) 기본 할당: 모든 투표소의 관내/관외에 1대씩 강제 할당
@@ -1271,60 +1506,43 @@ class ElectionAnalyzerApp:
         # 이제 이 'remaining' 개수만큼 추가 배분을 진행할 수 있습니다.    
         remaining = target_count - (num_stations * 2)
         
-        # (2) Greedy Algorithm
-        while remaining > 0: # 남은 장비가 0이 될 때까지 이 반복문을 계속 돌립니다.
-            # 이번 턴(장비 1대)을 받을 '가장 바쁜 곳'을 찾기 위한 비교 변수 초기화
-            max_load = -1 # 현재까지 발견된 '최대 부하(혼잡도)' 값
-            target_info = None # 장비를 받을 대상 정보 (투표소명, 장비타입)
-            
-            # 모든 투표소를 하나씩 확인하며 어디가 제일 급한지 비교합니다.
-            for st in current_alloc:
-                # 관외 업무 가중치 (1.156)
-                weight_extra = 1.156
-
-                # 현재 이 투표소에 배정된 관내 장비 수 확인
-                curr_intra = current_alloc[st]['intra']
-
-                if curr_intra > 0:
-                    # 관내 부하 = (예측된 관내 투표자 수) / (현재 관내 장비 수)
-                    # 예: 투표자 1000명 / 장비 2대 = 부하 500
-                    load_intra = station_stats[st]['intra_voters'] / curr_intra
-                else:
-                    load_intra = float('inf') # 0대면 무조건 최우선 배정
-
-                # 만약 이 투표소의 관내 부하가 지금까지 찾은 최대 부하보다 크다면?
-                if load_intra > max_load:
-                    max_load = load_intra # 최대 부하 값을 갱신하고
-                    target_info = (st, 'intra') # "현재 1등은 이 투표소의 '관내' 쪽입니다"라고 기록
-                
-                # 현재 이 투표소에 배정된 관외 장비 수 확인
-                curr_extra = current_alloc[st]['extra']
-                if curr_extra > 0:
-                    # 관외 부하 = (예측된 관외 투표자 수 * 1.156) / (현재 관외 장비 수)
-                    # *중요: 관외 투표자 수에 가중치를 곱해 부하를 더 높게(더 힘들게) 평가함
-                    load_extra = (station_stats[st]['extra_voters'] * weight_extra) / curr_extra
-                else:
-                    load_extra = float('inf') # 0대면 무조건 최우선 배정
-
-                # 만약 이 투표소의 관외 부하가 지금까지 찾은 최대 부하(관내 포함)보다 더 크다면?
-                if load_extra > max_load:
-                    max_load = load_extra # 최대 부하 값을 갱신하고
-                    target_info = (st, 'extra') # "현재 1등은 이 투표소의 '관외' 쪽입니다"라고 기록 (덮어쓰기)
-            
-            # for문이 끝나고 최종적으로 선정된 곳(target_info)이 있다면
-            if target_info:
-                st_name, r_type = target_info # 이름과 타입(intra/extra)을 꺼냅니다.
-                
-                # 해당 투표소의 해당 타입 장비를 1대 늘려줍니다. (즉시 반영)
-                # *중요: 여기서 +1 된 값은 다음 while 루프가 돌 때 'curr_intra/extra'가 되어
-                # 분모를 키우므로 부하를 낮추는 역할을 합니다.
-                current_alloc[st_name][r_type] += 1
-                # 사용할 수 있는 남은 장비 수를 1개 줄입니다.
-                remaining -= 1
-            else:
-                # 만약 더 이상 줄 곳이 없거나 오류가 있다면 반복을 종료합니다.
-                break
+        # [추가] 정확 최적화 모드: 제약 조건을 지키며 최대 부하를 최소화 (그리디 해로 시작, 최적성 격차 보고)
+        if exact:
+            caps, groups, group_budgets = self._exact_constraints(current_alloc)
+            remaining = target_count - sum(c['intra'] + c['extra'] for c in current_alloc.values())
+            info = exact_allocate(current_alloc, station_stats, remaining, self.weight_extra,
+                                  caps=caps, groups=groups, group_budgets=group_budgets, cancel=cancel)
+            if cancel.is_set():
+                return None
+            return current_alloc, info
 
+        # (2) Greedy Algorithm
+        # [최적화] '가장 부하가 큰 창구에 1대씩' 배정과 같은 결과를 목표 부하 이분 탐색으로 한 번에 계산
+        # (동점 구간의 마지막 몇 대만 힙 그리디로 배정 -> 배정 결과/동점 처리 순서는 기존과 동일)
+        bulk_allocate(current_alloc, station_stats, remaining, self.weight_extra)
+        return current_alloc, None
+
+    def _exact_constraints(self, current_alloc):
+        # [추가] 정확 최적화 제약 조건 -> (창구별 상한, 투표소별 읍면동, 읍면동별 기존 장비 수)
+        # 분소(제2사전투표소 이상, 제10 이상 포함)는 current_alloc 의 관외 최소 대수를 min_extra_branch 로 올림
+        for st in current_alloc:
+            if re.search(r'제([2-9]|\d{2,})사전', st.replace(" ", "")):
+                current_alloc[st]['extra'] = max(current_alloc[st]['extra'], self.min_extra_branch)
+
+        store = self.snapshots
+        groups = {}
+        group_budgets = {}
+        for st in current_alloc:
+            code = store.codes.get(st)
+            dong = store.dongs[code] if code is not None else None
+            groups[st] = dong
+            # 읍면동 안의 기존 장비(장비 현황 파일 기준)는 다른 읍면동으로 옮기지 않음
+            d = self.station_data[st]
+            group_budgets[dong] = group_budgets.get(dong, 0) + d['org_intra'] + d['org_extra']
+        return MAX_PER_QUEUE, groups, group_budgets
+
+    def _apply_auto_balance(self, current_alloc, total_assets, total_reserve, info=None):
+        # [추가] 메인 스레드에서 실행: 배분 결과를 station_data / 화면에 반영
         # 4. 결과 집계 및 UI 반영 (여기가 에러 났던 부분)
         total_intra_used = 0
         total_extra_used = 0
@@ -1367,12 +1585,18 @@ class ElectionAnalyzerApp:
                 # 5개 컬럼 구조에 맞춰 업데이트
                 self.tree.item(item_id, values=(st_name, elect_disp, disp_intra, disp_extra, rate_txt))
         
+        self._refresh_wait_column()
+
         # 5. 결과 메시지
         final_used = total_intra_used + total_extra_used
         msg = (f"배분 완료!\n\n"
                f"■ 총 보유 장비: {total_assets}대\n"
                f"■ 실제 배치: {final_used}대 (관내 {total_intra_used} / 관외 {total_extra_used})\n"
                f"■ 예비 장비: {total_reserve}대")
+        if info is not None:
+            # [추가] 정확 최적화 결과: 최대 부하(장비 1대당 투표자 수)와 최적성 격차
+            msg += (f"\n\n■ 최대 부하: {info['max_load']:.1f}명/대 (그리디 {info['greedy_max_load']:.1f}명/대)\n"
+                    f"■ 최적성 격차: {info['gap']:.1%}" + (" (최적해)" if info['optimal'] else ""))
                
         self.log(f"[자동 배분] 총 {total_assets}대 중 {final_used}대 배치 완료. (예비 {total_reserve})")
         messagebox.showinfo("배분 완료", msg)
@@ -1431,6 +1655,7 @@ class ElectionAnalyzerApp:
                 disp_extra = f"{org_extra} → {curr_extra}" if curr_extra != org_extra else str(curr_extra)
 
                 self.tree.item(item_id, values=(st_name, elect_disp, disp_intra, disp_extra, rate_txt))
+                self._refresh_wait_column()
                 self.log(f"{st_name} 조정률 변경: 내 {new_r_intra}% / 외 {new_r_extra}%")
                 pop.destroy()
             except ValueError:
@@ -1652,6 +1877,8 @@ class ElectionAnalyzerApp:
         return fig
 
 if __name__ == "__main__":
+    # [추가] exe(PyInstaller) 환경에서 프로세스 풀 병렬 로딩 지원
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = ElectionAnalyzerApp(root)
     root.mainloop()
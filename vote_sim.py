@@ -0,0 +1,228 @@
+# 사전투표 혼잡도 불확실성 / 대기시간 시뮬레이션 및 해석식 (vote_program / vote_program(w_ballotbox) 공용)
+import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+QUANTILES = (0.5, 0.9, 0.99)  # P50 / P90 / P99
+WAIT_REPS = 200  # 대기시간 시뮬레이션 반복 횟수
+
+
+def _perturb(rng, delta, turnout, shape_sigma):
+    # [투표소, 일차, 시간대] 순증가분 -> [투표소, 일차, 시간대, 시행] 변동을 준 투표자 수, 데이터 없는 칸 마스크
+    # 시행마다 일차 합계 = 원래 합계 x 투표율 배수(turnout) / 0 인 시간대는 0 유지
+    missing = np.isnan(delta)
+    base = np.where(missing | (delta < 0), 0.0, delta)[..., None]
+    day_total = base.sum(axis=2, keepdims=True)
+
+    noise = np.exp(rng.standard_normal(delta.shape + (turnout.shape[-1],)) * shape_sigma)
+    weight = base * noise
+    w_sum = weight.sum(axis=2, keepdims=True)
+    sim = np.divide(weight, w_sum, out=np.zeros_like(weight), where=w_sum > 0) * (day_total * turnout)
+    return sim, missing
+
+
+def monte_carlo_bands(delta_intra, delta_extra, n_draws=1000, quantiles=QUANTILES, turnout_sigma=0.1,
+                      shape_sigma=0.2, seed=None, batch_cells=4_000_000, cancel=None, progress=None):
+    """
+    지난 선거의 시간대별 순증가분에 무작위 변동을 주어 투표소/시간대별 투표자 수 분위수를 구합니다.
+    - delta_*: [투표소, 일차, 시간대] 순증가분 (증감 계수 적용 후, 데이터 없는 칸은 NaN)
+    - 투표율 변동: 투표소 x 시행마다 로그정규 배수 (평균 1, 표준편차 약 turnout_sigma), 관내/관외 공통
+    - 시간대 분포 변동: 칸마다 로그정규 배수(표준편차 약 shape_sigma)를 곱한 뒤 일차 합계가 유지되도록 다시 나눔
+      (하루 투표자 수는 투표율 변동만 받고, 시간대 비율만 흔들림 / 지난 선거에 투표자가 없던 시간대는 0 유지)
+    시행(n_draws)을 투표소 묶음 단위로 한 번에 계산하며, 묶음 크기는 배열 원소 수가 batch_cells 이하가 되도록 정합니다.
+    같은 seed 와 입력이면 같은 결과가 나옵니다.
+    묶음마다 progress(0~1)로 진행률을 알리고, cancel(threading.Event)이 설정되면 None 을 반환합니다.
+    반환 dict:
+    - intra / extra: [분위수, 투표소, 일차, 시간대] 순증가분 분위수 (데이터 없는 칸은 NaN)
+    - peak_intra / peak_extra: [분위수, 투표소] 시행별 '가장 붐비는 시간대' 투표자 수의 분위수
+    - quantiles: 사용한 분위수
+    """
+    rng = np.random.default_rng(seed)
+    q = np.asarray(quantiles, dtype=float)
+    n_st = delta_intra.shape[0]
+    result = {'quantiles': q}
+    for key, delta in (('intra', delta_intra), ('extra', delta_extra)):
+        result[key] = np.full((len(q),) + delta.shape, np.nan)
+        result['peak_' + key] = np.zeros((len(q), n_st))
+    if not delta_intra.size:
+        return result
+
+    step = max(1, batch_cells // (delta_intra[0].size * n_draws))
+    for start in range(0, n_st, step):
+        if cancel is not None and cancel.is_set():
+            return None
+        if progress is not None:
+            progress(start / n_st)
+        sl = slice(start, min(start + step, n_st))
+        n = sl.stop - sl.start
+        # 시행 축을 맨 뒤에 두어 분위수 계산 시 연속 메모리로 정렬
+        turnout = rng.lognormal(-turnout_sigma ** 2 / 2, turnout_sigma, size=(n, 1, 1, n_draws))
+        for key, delta in (('intra', delta_intra), ('extra', delta_extra)):
+            sim, missing = _perturb(rng, delta[sl], turnout, shape_sigma)
+            result[key][:, sl] = np.where(missing, np.nan, np.quantile(sim, q, axis=-1))
+            result['peak_' + key][:, sl] = np.quantile(sim.reshape(n, -1, n_draws).max(axis=1), q, axis=-1)
+    return result
+
+
+def required_booths(peak_per_hour, seconds):
+    # 기표대 소요량: 최다 투표 시간대 인원 x 1인당 기표 시간으로 필요한 대수 (최소 2대)
+    return max(2, math.ceil((peak_per_hour * seconds) / 3600))
+
+
+def erlang_c(arrivals_per_hour, service_sec, servers):
+    """
+    M/M/c 대기열 해석식(Erlang-C): 모든 칸의 대기 확률과 평균 대기시간을 배열 연산 한 번으로 계산합니다.
+    - arrivals_per_hour: 시간당 도착 인원 (예: [투표소, 일차, 시간대], NaN 칸은 NaN 반환)
+    - service_sec: 1인당 처리 시간 [초], servers: 장비 수 (둘 다 arrivals_per_hour 에 브로드캐스트 가능)
+    Erlang-B 점화식 B(k) = a B(k-1) / (k + a B(k-1)) 을 로그 공간에서 계산하므로 장비 수가 커도
+    a^c / c! 오버플로가 없습니다. (반복 횟수 = 최대 장비 수, 각 반복은 전체 칸 배열 연산)
+    처리 능력을 넘는 칸(부하율 >= 1)은 대기 확률 1, 평균 대기 inf / 도착이 없으면 0.
+    반환: (대기 확률, 평균 대기 [분])
+    """
+    lam, sec, c = np.broadcast_arrays(np.asarray(arrivals_per_hour, dtype=float),
+                                      np.asarray(service_sec, dtype=float),
+                                      np.floor(np.asarray(servers, dtype=float)))
+    a = np.clip(lam, 0, None) * sec / 3600.0  # 제공 부하 [얼랑]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_a = np.log(a)
+        log_b = np.zeros(a.shape)  # B(0) = 1
+        for k in range(1, int(np.nanmax(c, initial=0)) + 1):
+            x = log_a + log_b
+            log_b = np.where(k <= c, x - np.logaddexp(math.log(k), x), log_b)
+        rho = a / c
+        stable = (c > 0) & (rho < 1)
+        # C = B / (1 - rho (1 - B))
+        log_c = log_b - np.log1p(-rho * -np.expm1(log_b))
+        p_wait = np.where(stable, np.exp(log_c), 1.0)
+        wait = np.where(stable, p_wait * sec / (c - a) / 60.0, np.inf)
+    idle = a == 0
+    p_wait = np.where(idle, 0.0, p_wait)
+    wait = np.where(idle, 0.0, wait)
+    missing = np.isnan(a)
+    return np.where(missing, np.nan, p_wait), np.where(missing, np.nan, wait)
+
+
+def _arrival_slots(hours, present):
+    # 칸별 도착 구간 (시작, 끝) [시간 단위]: 같은 날 직전 데이터 시간대 ~ 해당 시간대 (첫 칸은 1시간 전부터)
+    start = np.zeros(present.shape)
+    for d in range(present.shape[0]):
+        prev = None
+        for h in np.nonzero(present[d])[0]:
+            start[d, h] = hours[prev] if prev is not None else hours[h] - 1
+            prev = h
+    return start, np.broadcast_to(hours.astype(float), present.shape)
+
+
+def _fcfs(arrivals, servers, service):
+    # 선착순 c 창구 대기열: arrivals [반복, 인원] (반복마다 오름차순) -> (대기 시간, 종료 시각)
+    # 인원 축만 파이썬으로 돌고 반복 축은 배열 연산 (반복마다 가장 먼저 비는 창구에 배정)
+    n_rep, n = arrivals.shape
+    free = np.zeros((n_rep, servers))
+    waits = np.empty((n_rep, n))
+    ends = np.empty((n_rep, n))
+    rows = np.arange(n_rep)
+    for i in range(n):
+        k = free.argmin(axis=1)
+        start = np.maximum(arrivals[:, i], free[rows, k])
+        ends[:, i] = free[rows, k] = start + service[:, i]
+        waits[:, i] = start - arrivals[:, i]
+    return waits, ends
+
+
+def _service_times(rng, shape, mean, samples):
+    # 1인당 처리 시간 [분]: samples(실측 초 목록)가 있으면 그 안에서 복원 추출, 없으면 지수분포(M/M/c)
+    if samples is not None and len(samples):
+        return rng.choice(np.asarray(samples, dtype=float), size=shape) / 60.0
+    return rng.exponential(mean / 60.0, size=shape)
+
+
+def simulate_lane(counts, hours, present, servers, service_sec, booths=0, booth_sec=0,
+                  service_samples=None, n_reps=WAIT_REPS, seed=None):
+    """
+    투표소 1곳의 관내 또는 관외 창구 대기시간 이산 사건 시뮬레이션.
+    - counts: [일차, 시간대] 시간대별 도착 인원 (순증가분), present: 데이터가 있는 칸
+    - 도착: 칸마다 반올림한 인원을 도착 구간(직전 데이터 시간대 ~ 해당 시간대)에 균등하게 무작위 배치
+    - 1단계 발급: servers 대, 1인당 service_sec 초 (지수분포 또는 service_samples 실측값)
+    - 2단계 기표: booths 대, 1인당 booth_sec 초 (booths 또는 booth_sec 가 0 이면 생략)
+    일차마다 빈 대기열에서 시작하며 n_reps 번 반복합니다.
+    반환: (평균 대기[일차, 시간대], 95% 대기[일차, 시간대]) [분], 도착 시간대 기준 / 데이터 없는 칸은 NaN
+    장비가 0대인데 도착 인원이 있는 날은 inf (erlang_c 의 처리 능력 초과와 동일)
+    """
+    rng = np.random.default_rng(seed)
+    mean = np.full(present.shape, np.nan)
+    p95 = np.full(present.shape, np.nan)
+    start, end = _arrival_slots(hours, present)
+    counts = np.where(present, np.nan_to_num(counts), 0).clip(min=0).round().astype(int)
+
+    for d in range(present.shape[0]):
+        cells = np.nonzero(present[d])[0]
+        n = int(counts[d, cells].sum())
+        if not n:
+            mean[d, cells] = 0.0
+            p95[d, cells] = 0.0
+            continue
+        if servers <= 0:
+            # 장비 없이 도착만 있음 -> 대기 무한 (도착이 없는 시간대는 0)
+            mean[d, cells] = p95[d, cells] = np.where(counts[d, cells] > 0, np.inf, 0.0)
+            continue
+        cell_of = np.repeat(cells, counts[d, cells])
+        arr = rng.uniform(start[d, cell_of], end[d, cell_of], size=(n_reps, n)) * 60.0
+        order = np.argsort(arr, axis=1)
+        arr = np.take_along_axis(arr, order, axis=1)
+        cell_sorted = cell_of[order]
+
+        waits, ends = _fcfs(arr, servers, _service_times(rng, (n_reps, n), service_sec, service_samples))
+        if booths > 0 and booth_sec > 0:
+            # 발급이 끝난 순서대로 기표대에 도착
+            order2 = np.argsort(ends, axis=1)
+            ends_sorted = np.take_along_axis(ends, order2, axis=1)
+            w2_sorted, _ = _fcfs(ends_sorted, booths, rng.exponential(booth_sec / 60.0, size=(n_reps, n)))
+            w2 = np.empty_like(w2_sorted)
+            np.put_along_axis(w2, order2, w2_sorted, axis=1)
+            waits = waits + w2
+
+        for h in cells:
+            w = waits[cell_sorted == h]
+            if w.size:
+                mean[d, h] = w.mean()
+                p95[d, h] = np.percentile(w, 95)
+            else:
+                mean[d, h] = p95[d, h] = 0.0
+    return mean, p95
+
+
+def _simulate_station(job):
+    # 프로세스 풀 작업 단위: 투표소 1곳의 관내/관외 창구 -> (투표소 코드, {'intra': (평균, 95%), 'extra': ...})
+    code = job['code']
+    result = {}
+    for key in ('intra', 'extra'):
+        result[key] = simulate_lane(job['counts'][key], job['hours'], job['present'], job['servers'][key],
+                                    job['service_sec'][key], job['booths'][key], job['booth_sec'][key],
+                                    job.get('service_samples', {}).get(key), job.get('n_reps', WAIT_REPS),
+                                    job.get('seed'))
+    return code, result
+
+
+def simulate_waits(jobs, workers=1, log=None):
+    """
+    여러 투표소의 대기시간 시뮬레이션 -> {투표소 코드: {'intra': (평균, 95%), 'extra': (평균, 95%)}}
+    jobs: _simulate_station 작업 dict 목록 (code, counts, hours, present, servers, service_sec, booths, booth_sec)
+    workers > 1 이면 투표소 단위로 프로세스 풀에서 병렬 실행합니다. (시드는 작업마다 지정 -> 병렬 여부와 무관하게 같은 결과)
+    """
+    log = log or (lambda msg: None)
+    results = {}
+    total = len(jobs)
+    if workers > 1 and total > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, total)) as pool:
+            futures = [pool.submit(_simulate_station, job) for job in jobs]
+            for done, fut in enumerate(as_completed(futures), 1):
+                code, result = fut.result()
+                results[code] = result
+                log(f"대기시간 시뮬레이션 ({done}/{total})")
+    else:
+        for done, job in enumerate(jobs, 1):
+            code, result = _simulate_station(job)
+            results[code] = result
+            log(f"대기시간 시뮬레이션 ({done}/{total})")
+    return results
@@ -1,11 +1,11 @@
 import streamlit as st
 import pandas as pd
-import re
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import seaborn as sns
 import platform
 import io
+from vote_data import read_vote_file
 
 # 한글 폰트 설정
 system_name = platform.system()
@@ -73,38 +73,13 @@ with st.sidebar:
     
     equip_file = st.file_uploader("작성한 장비 파일 업로드", type=['xlsx', 'xls'])
 
-# 함수 정의 (파일 정보 읽기)
+# 함수 정의 (파일 정보 + 본문 읽기)
 def get_file_info(file_obj):
     try:
-        # Streamlit의 파일 객체는 바로 read 가능
-        if file_obj.name.endswith('.csv'):
-            try:
-                df_meta = pd.read_csv(file_obj, header=None, nrows=10, encoding='cp949')
-            except:
-                file_obj.seek(0)
-                df_meta = pd.read_csv(file_obj, header=None, nrows=10, encoding='utf-8')
-        else:
-            df_meta = pd.read_excel(file_obj, header=None, nrows=10)
-        
-        day = None
-        time = None
-        header_idx = 3
-
-        for idx, row in df_meta.iterrows():
-            row_str = " ".join(row.astype(str).values)
-            if day is None:
-                match_day = re.search(r'\[(\d+)일차\]', row_str)
-                match_time = re.search(r'\[(\d{1,2}):(\d{2})\]', row_str)
-                if match_day: day = int(match_day.group(1))
-                if match_time: time = int(match_time.group(1))
-            if "읍면동명" in row_str:
-                header_idx = idx
-        
-        # 파일 포인터 초기화
-        file_obj.seek(0)
-        return day, time, header_idx
+        # [최적화] 메타정보와 본문을 한 번의 파싱으로 함께 읽음
+        return read_vote_file(file_obj, header_keys=("읍면동명",))
     except Exception as e:
-        return None, None, 3
+        return None, None, None
 
 # 2. 메인 분석 로직
 if st.button("🚀 분석 시작하기", type="primary"):
@@ -121,19 +96,10 @@ if st.button("🚀 분석 시작하기", type="primary"):
             progress_bar.progress((i + 1) / len(uploaded_files))
             
             try:
-                day, time, header_row = get_file_info(file)
+                day, time, df = get_file_info(file)
                 
                 if day is None or time is None:
                     continue
-                
-                if file.name.endswith('.csv'):
-                    try:
-                        df = pd.read_csv(file, header=header_row, encoding='cp949')
-                    except:
-                        file.seek(0)
-                        df = pd.read_csv(file, header=header_row, encoding='utf-8')
-                else:
-                    df = pd.read_excel(file, header=header_row)
 
                 if '읍면동명' not in df.columns:
                     continue